@@ -0,0 +1,82 @@
+# benchmarks/bench_download_server.py
+"""Download throughput with concurrent clients: sendfile via the download server versus a buffered handler.
+
+Run from the repository root:
+    python benchmarks/bench_download_server.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.download_server import DownloadServer
+
+FILE_MB = 64
+CLIENTS = 32
+HOST = "127.0.0.1"
+PORT = 8765
+BUFFERED_PORT = 8766
+
+
+async def buffered_server(products_dir):
+    # Reads the whole file into memory for every request
+    async def handle(request):
+        with open(os.path.join(products_dir, request.match_info["name"]), "rb") as file:
+            return web.Response(body=file.read())
+
+    app = web.Application()
+    app.router.add_get("/files/{name}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, BUFFERED_PORT).start()
+    return runner
+
+
+async def fetch_all(urls):
+    async def fetch(session, url):
+        size = 0
+        async with session.get(url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(1024 * 1024):
+                size += len(chunk)
+        return size
+
+    async with ClientSession() as session:
+        start = time.perf_counter()
+        sizes = await asyncio.gather(*(fetch(session, url) for url in urls))
+        return sum(sizes), time.perf_counter() - start
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as products_dir:
+        with open(os.path.join(products_dir, "build.jar"), "wb") as file:
+            file.write(os.urandom(FILE_MB * 1024 * 1024))
+
+        async def license_lookup(user_id, product):
+            return "LICENSE"
+
+        server = DownloadServer(
+            HOST, PORT, f"http://{HOST}:{PORT}", "benchmark-secret", products_dir, license_lookup,
+            max_downloads=1
+        )
+        await server.start()
+        buffered = await buffered_server(products_dir)
+        try:
+            signed_urls = [server.make_link(user_id, "Build", "LICENSE", "build.jar") for user_id in range(CLIENTS)]
+            signed_bytes, signed_s = await fetch_all(signed_urls)
+            buffered_bytes, buffered_s = await fetch_all([f"http://{HOST}:{BUFFERED_PORT}/files/build.jar"] * CLIENTS)
+        finally:
+            await server.stop()
+            await buffered.cleanup()
+
+    print(f"{CLIENTS} concurrent downloads of a {FILE_MB} MB file")
+    print(f"  buffered handler  {buffered_bytes / buffered_s / 1e6:10.1f} MB/s  ({buffered_s:.2f} s)")
+    print(f"  sendfile server   {signed_bytes / signed_s / 1e6:10.1f} MB/s  ({signed_s:.2f} s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+# benchmarks/bench_giveaway_entries.py
+"""Entry clicks on a giveaway with 50k entrants: list scans versus the registry.
+
+Run from the repository root:
+    python benchmarks/bench_giveaway_entries.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.giveaway_registry import GiveawayRegistry, ParticipantSet
+
+ENTRANTS = 50_000
+ACTIVE_GIVEAWAYS = 20
+CLICKS = 2_000
+
+
+def list_toggle(giveaways, message_id, user_id):
+    for giveaway in giveaways:
+        if giveaway["message_id"] == message_id:
+            if user_id in giveaway["participants"]:
+                giveaway["participants"].remove(user_id)
+            else:
+                giveaway["participants"].append(user_id)
+            return
+
+
+def registry_toggle(registry, message_id, user_id):
+    registry.get(message_id)["participants"].toggle(user_id)
+
+
+def main():
+    user_ids = [1100000000000000000 + i for i in range(ENTRANTS)]
+    message_ids = [1300000000000000000 + i for i in range(ACTIVE_GIVEAWAYS)]
+    target = message_ids[-1]
+
+    giveaways = [{"message_id": mid, "participants": []} for mid in message_ids]
+    giveaways[-1]["participants"] = list(user_ids)
+    registry = GiveawayRegistry()
+    for mid in message_ids:
+        registry.add({"message_id": mid, "participants": ParticipantSet()})
+    registry.get(target)["participants"] = ParticipantSet(user_ids)
+
+    # Mix of new entrants and people leaving
+    rng = random.Random(0)
+    clicks = [rng.choice(user_ids) if rng.random() < 0.5 else 1200000000000000000 + i for i in range(CLICKS)]
+
+    start = time.perf_counter()
+    for user_id in clicks:
+        list_toggle(giveaways, target, user_id)
+    list_us = (time.perf_counter() - start) / CLICKS * 1_000_000
+
+    start = time.perf_counter()
+    for user_id in clicks:
+        registry_toggle(registry, target, user_id)
+    registry_us = (time.perf_counter() - start) / CLICKS * 1_000_000
+
+    assert len(giveaways[-1]["participants"]) == len(registry.get(target)["participants"])
+    print(f"{ENTRANTS:,} entrants, {ACTIVE_GIVEAWAYS} active giveaways, {CLICKS:,} clicks")
+    print(f"  list     {list_us:10.2f} us per click")
+    print(f"  registry {registry_us:10.2f} us per click")
+
+
+if __name__ == "__main__":
+    main()
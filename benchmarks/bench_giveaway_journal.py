@@ -0,0 +1,79 @@
+# benchmarks/bench_giveaway_journal.py
+"""Write amplification of giveaway entries: full giveaways.json rewrites versus the entry journal.
+
+Run from the repository root:
+    python benchmarks/bench_giveaway_journal.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.giveaway_journal import EntryJournal
+
+ENTRANTS = 50_000
+CLICKS = 2_000
+COMPACT_AFTER = 500  # lower than the bot default so compaction shows up in a short run
+MESSAGE_ID = 1300000000000000000
+
+
+def snapshot(participants):
+    return json.dumps([{
+        "channel_id": 1200000000000000000,
+        "message_id": MESSAGE_ID,
+        "prize": "Citizens license",
+        "winners_count": 1,
+        "end_time": "2026-10-18T20:00:00",
+        "participants": participants,
+        "host_id": 1100000000000000000,
+        "description": ""
+    }], indent=4)
+
+
+def main():
+    participants = [1100000000000000000 + i for i in range(ENTRANTS)]
+    new_users = [1200000000000000000 + i for i in range(CLICKS)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Current approach: every click rewrites the whole file
+        path = os.path.join(tmp, "giveaways.json")
+        rewrite_bytes = 0
+        start = time.perf_counter()
+        for user_id in new_users:
+            participants.append(user_id)
+            text = snapshot(participants)
+            with open(path, "w") as f:
+                f.write(text)
+            rewrite_bytes += len(text)
+        rewrite_s = time.perf_counter() - start
+        del participants[-CLICKS:]
+
+        # Journal: one small record per click plus periodic compaction
+        journal = EntryJournal(os.path.join(tmp, "entries.jsonl"))
+        snapshot_bytes = 0
+        start = time.perf_counter()
+        for user_id in new_users:
+            participants.append(user_id)
+            journal.append(MESSAGE_ID, user_id, True)
+            if journal.records >= COMPACT_AFTER:
+                journal.rotate()
+                text = snapshot(participants)
+                with open(path, "w") as f:
+                    f.write(text)
+                snapshot_bytes += len(text)
+                journal.discard_rotated()
+        journal.close()
+        journal_s = time.perf_counter() - start
+        journal_bytes = journal.bytes_written
+
+    print(f"{CLICKS:,} entry clicks on a giveaway with {ENTRANTS:,} entrants")
+    print(f"  full rewrite  {rewrite_bytes / 1e6:10.1f} MB written  {rewrite_s * 1000 / CLICKS:8.3f} ms per click")
+    print(f"  journal       {(journal_bytes + snapshot_bytes) / 1e6:10.3f} MB written  {journal_s * 1000 / CLICKS:8.3f} ms per click"
+          f"  ({journal_bytes:,} B journal, {snapshot_bytes:,} B snapshots)")
+    print(f"  amplification {rewrite_bytes / max(journal_bytes + snapshot_bytes, 1):10.0f}x fewer bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_ticket_index.py
+"""Ticket lookups with 100k historical tickets: linear scans versus TicketIndex.
+
+Run from the repository root:
+    python benchmarks/bench_ticket_index.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.ticket_index import TicketIndex
+
+GUILD_ID = "1212778417960001569"
+TICKETS = 100_000
+OPEN_TICKETS = 50
+LOOKUPS = 200
+
+
+def make_tickets():
+    tickets = {}
+    for number in range(1, TICKETS + 1):
+        tickets[str(number)] = {
+            "ticket_id": str(number),
+            "channel_id": str(1300000000000000000 + number),
+            "user_id": str(1100000000000000000 + number % 20_000),
+            "status": "open" if number > TICKETS - OPEN_TICKETS else "closed"
+        }
+    return {GUILD_ID: {"tickets": tickets, "counter": TICKETS}}
+
+
+def scan_channel(tickets_data, channel_id):
+    for t_num, ticket in tickets_data[GUILD_ID]["tickets"].items():
+        if str(channel_id) == ticket["channel_id"] and ticket["status"] == "open":
+            return t_num
+    return None
+
+
+def scan_open_ticket(tickets_data, user_id):
+    for ticket_id, ticket in tickets_data[GUILD_ID]["tickets"].items():
+        if ticket["user_id"] == user_id and ticket["status"] == "open":
+            return ticket_id
+    return None
+
+
+def main():
+    tickets_data = make_tickets()
+    rng = random.Random(0)
+    channels = [1300000000000000000 + rng.randint(TICKETS - OPEN_TICKETS + 1, TICKETS) for _ in range(LOOKUPS)]
+    users = [str(1100000000000000000 + rng.randrange(20_000)) for _ in range(LOOKUPS)]
+
+    start = timeit.default_timer()
+    index = TicketIndex()
+    index.rebuild(tickets_data)
+    build_ms = (timeit.default_timer() - start) * 1000
+
+    def timed(func, args):
+        start = timeit.default_timer()
+        for arg in args:
+            func(arg)
+        return (timeit.default_timer() - start) / len(args) * 1_000_000
+
+    print(f"{TICKETS:,} tickets ({OPEN_TICKETS} open), index build {build_ms:.1f} ms")
+    print(f"  on_message lookup     scan {timed(lambda c: scan_channel(tickets_data, c), channels):10.1f} us"
+          f"   index {timed(index.ticket_for_channel, channels):8.3f} us")
+    print(f"  open-ticket check     scan {timed(lambda u: scan_open_ticket(tickets_data, u), users):10.1f} us"
+          f"   index {timed(lambda u: index.open_ticket_for_user(GUILD_ID, u), users):8.3f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/bench_user_store.py
+"""Per-sale latency of the users.json path versus the SQLite user store.
+
+Run from the repository root:
+    python benchmarks/bench_user_store.py
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.user_store import JsonUserStore, SQLiteUserStore
+
+PRODUCTS = [f"Product-{i}" for i in range(20)]
+SIZES = [1_000, 10_000, 100_000]
+SALES = 50
+
+
+def make_users(count):
+    rng = random.Random(count)
+    users = {}
+    for i in range(count):
+        owned = rng.sample(PRODUCTS, rng.randint(1, 4))
+        users[str(100000000000000000 + i)] = {
+            "total-payment": rng.randint(0, 5_000_000),
+            "ownership": {product: f"KEY-{i}-{product}" for product in owned}
+        }
+    return users
+
+
+def time_sales(store, count):
+    rng = random.Random(0)
+    samples = []
+    for _ in range(SALES):
+        user_id = str(100000000000000000 + rng.randrange(count))
+        start = time.perf_counter()
+        store.grant(user_id, rng.choice(PRODUCTS), "BENC-HMAR-KKEY-0000", 150_000)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label, samples):
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"  {label:<7} median {statistics.median(samples):9.3f} ms   p95 {p95:9.3f} ms")
+
+
+def main():
+    for count in SIZES:
+        users = make_users(count)
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "users.json")
+            with open(json_path, "w", encoding="utf-8") as file:
+                json.dump(users, file, indent=4)
+
+            sqlite_store = SQLiteUserStore(os.path.join(tmp, "users.db"))
+            sqlite_store.import_users(users)
+
+            print(f"{count:,} users")
+            report("json", time_sales(JsonUserStore(json_path), count))
+            report("sqlite", time_sales(sqlite_store, count))
+            sqlite_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,9 @@ import sys
 # Add the dev directory to the path for importing license key generator
 sys.path.append('dev')
 
-# Import common utilities from main
-from main import save_json, ADMIN_ROLE_ID, MEMBERSHIP_ROLES, DEFAULT_CHANNELS_PATH, CATEGORY_PATH, PRODUCT_PATH, load_json_from_web
+# Import common utilities
+from common import save_json, ADMIN_ROLE_ID, MEMBERSHIP_ROLES, RELEASE_SENDS_PER_SECOND
+from services import persistence
 
 class AdminCommands(commands.Cog):
     def __init__(self, bot):
@@ -75,8 +76,8 @@ class AdminCommands(commands.Cog):
     async def post_default(self, inter: disnake.ApplicationCommandInteraction):
         await inter.response.defer(ephemeral=True)
         
-        # Load default channels data
-        default_channels = load_json_from_web(DEFAULT_CHANNELS_PATH)
+        # Read default channels from the current catalog snapshot
+        default_channels = self.bot.catalog.default_channels
         
         if not default_channels:
             await inter.edit_original_message(content="❌ Could not load default channels data.")
@@ -180,9 +181,9 @@ class AdminCommands(commands.Cog):
     async def post_sells(self, inter: disnake.ApplicationCommandInteraction):
         await inter.response.defer(ephemeral=True)
         
-        # Load category and product data
-        categories = load_json_from_web(CATEGORY_PATH)
-        products = load_json_from_web(PRODUCT_PATH)
+        # Read category and product data from the current catalog snapshot
+        categories = self.bot.catalog.categories
+        products = self.bot.catalog.products
         
         if not categories or not products:
             await inter.edit_original_message(content="❌ Could not load category or product data.")
@@ -274,5 +275,178 @@ class AdminCommands(commands.Cog):
         
         await inter.edit_original_message(embed=report)
 
+    @fuji.sub_command(name="release", description="Notify every owner of a product about an update")
+    async def release(
+        self,
+        inter: disnake.ApplicationCommandInteraction,
+        product: str = commands.Param(description="Product that was updated"),
+        message: str = commands.Param(description="Release notes sent to every owner"),
+        include_file: bool = commands.Param(default=False, description="Include a download of the current file")
+    ):
+        if product not in self.bot.catalog.products:
+            await inter.response.send_message(f"❌ Unknown product **{product}**.", ephemeral=True)
+            return
+        transactions = self.bot.get_cog("TransactionCommands")
+        if not transactions:
+            await inter.response.send_message("❌ The transaction module is not loaded.", ephemeral=True)
+            return
+        
+        release = await transactions.releases.create(product, message, include_file)
+        if not release["total"]:
+            await inter.response.send_message(f"Nobody owns **{product}** yet.", ephemeral=True)
+            return
+        seconds = release["total"] / RELEASE_SENDS_PER_SECOND
+        await inter.response.send_message(
+            f"✅ Release #{release['release_id']} queued: notifying {release['total']} owner"
+            f"{'s' if release['total'] > 1 else ''} of **{product}** (about {max(1, round(seconds / 60))} min).\n"
+            f"Use `/fuji releases` to follow its progress.",
+            ephemeral=True
+        )
+
+    @fuji.sub_command(name="releases", description="Show the progress of recent release notices")
+    async def releases(
+        self,
+        inter: disnake.ApplicationCommandInteraction,
+        cancel: str = commands.Param(default="", description="Running release to cancel")
+    ):
+        transactions = self.bot.get_cog("TransactionCommands")
+        if not transactions:
+            await inter.response.send_message("❌ The transaction module is not loaded.", ephemeral=True)
+            return
+        
+        if cancel:
+            try:
+                cancelled = await transactions.releases.cancel(int(cancel.lstrip("#")))
+            except ValueError:
+                await inter.response.send_message("Invalid release ID format.", ephemeral=True)
+                return
+            await inter.response.send_message(
+                f"✅ Release {cancel} cancelled." if cancelled else f"❌ Release {cancel} is not running.",
+                ephemeral=True
+            )
+            return
+        
+        recent = await asyncio.to_thread(transactions.releases.releases, 10)
+        if not recent:
+            await inter.response.send_message("No releases have been sent yet.", ephemeral=True)
+            return
+        embed = disnake.Embed(title="Release Notices", color=disnake.Color.blue())
+        for release in recent:
+            embed.add_field(
+                name=f"#{release['release_id']} {release['product']} ({release['status']})",
+                value=(
+                    f"Sent: {release['sent']}/{release['total']}\nFailed: {release['failed']}\n"
+                    f"Started: <t:{int(release['created_at'])}:R>"
+                ),
+                inline=True
+            )
+        await inter.response.send_message(embed=embed, ephemeral=True)
+
+    @fuji.sub_command(name="stats", description="Show internal performance counters")
+    async def stats(self, inter: disnake.ApplicationCommandInteraction):
+        embed = disnake.Embed(
+            title="Bot Statistics",
+            color=disnake.Color.blue()
+        )
+        
+        # Write-behind persistence counters
+        for store_stats in persistence.stats():
+            embed.add_field(
+                name=store_stats["path"],
+                value=f"Writes: {store_stats['writes_performed']}\nAvoided: {store_stats['writes_avoided']}",
+                inline=True
+            )
+        
+        # Role / category / channel name lookups
+        resolver_stats = self.bot.resolver.stats()
+        embed.add_field(
+            name="Guild resolver",
+            value=(
+                f"Hits: {resolver_stats['hits']}\nMisses: {resolver_stats['misses']}\n"
+                f"Invalidations: {resolver_stats['invalidations']}\nUpdates: {resolver_stats['updates']}"
+            ),
+            inline=True
+        )
+        
+        # Delayed job worker
+        job_stats = self.bot.jobs.stats()
+        embed.add_field(
+            name="Delayed jobs",
+            value=f"Scheduled: {job_stats['scheduled']}\nCompleted: {job_stats['completed']}\nFailed: {job_stats['failed']}",
+            inline=True
+        )
+        
+        # Product file manifest
+        manifest_stats = self.bot.manifest.stats()
+        embed.add_field(
+            name="Product files",
+            value=(
+                f"Files: {manifest_stats['files']}\nScans: {manifest_stats['scans']}\n"
+                f"Missing: {manifest_stats['problems']}"
+            ),
+            inline=True
+        )
+        
+        # Product deliveries
+        delivery_stats = self.bot.jobs.stats("deliver_product")
+        success_rate = delivery_stats["success_rate"]
+        mean_latency = delivery_stats["mean_latency"]
+        embed.add_field(
+            name="Deliveries",
+            value=(
+                f"Delivered: {delivery_stats['completed']}\nDead-lettered: {delivery_stats['failed']}\n"
+                f"Retries: {delivery_stats['retries']}\n"
+                f"Success rate: {f'{success_rate:.1%}' if success_rate is not None else 'n/a'}\n"
+                f"Mean latency: {f'{mean_latency:.1f}s' if mean_latency is not None else 'n/a'}"
+            ),
+            inline=True
+        )
+        
+        # Pre-created order channels
+        transactions = self.bot.get_cog("TransactionCommands")
+        if transactions:
+            pool_stats = transactions.pool.stats()
+            embed.add_field(
+                name="Order channel pool",
+                value=f"Available: {pool_stats['available']}\nHits: {pool_stats['hits']}\nMisses: {pool_stats['misses']}",
+                inline=True
+            )
+            attachment_stats = transactions.attachments.stats()
+            embed.add_field(
+                name="Attachment cache",
+                value=(
+                    f"Files: {attachment_stats['cached']}\nHits: {attachment_stats['hits']}\n"
+                    f"Link refreshes: {attachment_stats['refreshes']}\nUploads: {attachment_stats['uploads']}"
+                ),
+                inline=True
+            )
+            if transactions.downloads:
+                download_stats = transactions.downloads.stats()
+                embed.add_field(
+                    name="Download server",
+                    value=(
+                        f"Downloads: {download_stats['downloads']}\nRejected: {download_stats['rejected']}\n"
+                        f"Served: {download_stats['bytes_served'] / 1e6:.1f} MB"
+                    ),
+                    inline=True
+                )
+            release_stats = transactions.releases.stats()
+            embed.add_field(
+                name="Release notices",
+                value=(
+                    f"Running: {release_stats['running']}\nSent: {release_stats['sent']}\n"
+                    f"Failed: {release_stats['failed']}"
+                ),
+                inline=True
+            )
+            guard_stats = transactions.guard.stats()
+            embed.add_field(
+                name="Order guard",
+                value=f"Duplicates collapsed: {guard_stats['collapsed']}\nRate limited: {guard_stats['limited']}",
+                inline=True
+            )
+        
+        await inter.response.send_message(embed=embed, ephemeral=True)
+
 def setup(bot):
     bot.add_cog(AdminCommands(bot))
\ No newline at end of file
@@ -1,13 +1,29 @@
 import disnake
-from disnake.ext import commands, tasks
+from disnake.ext import commands
 import asyncio
 import datetime
-import random
 import json
 import os
+from common import PERSIST_FLUSH_INTERVAL, MEMBERSHIP_ROLES, MEMBERSHIP_DRAW_WEIGHTS
+from services.persistence import DebouncedJSONFile
+from services.giveaway_registry import GiveawayRegistry, ParticipantSet
+from services.edit_coalescer import EditCoalescer
+from services.deadline_scheduler import DeadlineScheduler
+from services.giveaway_journal import EntryJournal
+from services.giveaway_archive import GiveawayArchive
+from services.weighted_draw import draw_winners, tier_weights
 
 # Configuration - replace with your actual admin role ID
 ADMIN_ROLE_ID = 123456789012345678  # Replace with your admin role ID
+# Minimum seconds between edits of a giveaway message's entry count
+EMBED_UPDATE_INTERVAL = 5
+# Maximum number of giveaways ended at the same time
+END_CONCURRENCY = 4
+# Entry records after which the journal is folded into giveaways.json
+JOURNAL_COMPACT_AFTER = 5000
+# How long ended giveaways stay available for /giveaway reroll
+ARCHIVE_RETENTION_DAYS = 30
+ARCHIVE_MAX_ENTRIES = 500
 
 # Check if user has admin role
 def has_admin_role():
@@ -109,14 +125,26 @@ class GiveawayModal(disnake.ui.Modal):
 class GiveawayCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.giveaways = []
+        self.giveaways = GiveawayRegistry()
         self.data_file = "database/giveaways.json"
+        self.giveaways_store = DebouncedJSONFile(self.data_file, self.serialize_giveaways, PERSIST_FLUSH_INTERVAL)
+        self.embed_updates = EditCoalescer(EMBED_UPDATE_INTERVAL)
+        self.scheduler = DeadlineScheduler(self.end_due_giveaway, END_CONCURRENCY)
+        # Entries go to an append-only journal; giveaways.json is the snapshot
+        self.journal = EntryJournal("database/giveaway_entries.jsonl")
+        self.compaction_task = None
+        self.archive = GiveawayArchive(
+            "database/giveaway_archive.json", ARCHIVE_RETENTION_DAYS, ARCHIVE_MAX_ENTRIES, PERSIST_FLUSH_INTERVAL
+        )
         self.load_giveaways()
-        self.check_giveaways.start()
+        self.scheduler_task = self.bot.loop.create_task(self.run_scheduler())
     
     def cog_unload(self):
-        self.check_giveaways.cancel()
-        self.save_giveaways()
+        self.scheduler_task.cancel()
+        self.embed_updates.cancel_all()
+        self.compact_journal_now()
+        self.journal.close()
+        self.archive.flush()
     
     def load_giveaways(self):
         if os.path.exists(self.data_file):
@@ -128,62 +156,89 @@ class GiveawayCog(commands.Cog):
                     end_time_str = giveaway_data["end_time"]
                     end_time = datetime.datetime.fromisoformat(end_time_str)
                     
-                    # Skip already ended giveaways
-                    if end_time < datetime.datetime.now():
-                        continue
-                    
-                    self.giveaways.append({
+                    self.giveaways.add({
                         "channel_id": giveaway_data["channel_id"],
                         "message_id": giveaway_data["message_id"],
                         "prize": giveaway_data["prize"],
                         "winners_count": giveaway_data["winners_count"],
                         "end_time": end_time,
-                        "participants": giveaway_data["participants"],
+                        "participants": ParticipantSet(giveaway_data["participants"]),
                         "host_id": giveaway_data["host_id"],
                         "description": giveaway_data.get("description", "")
                     })
+                    
+                    # Giveaways that expired while the bot was offline end right after startup
+                    self.scheduler.schedule(giveaway_data["message_id"], end_time.timestamp())
             except (json.JSONDecodeError, KeyError, ValueError) as e:
                 print(f"Error loading giveaways: {e}")
+        
+        # Replay entries recorded after the last snapshot, then fold them in
+        replayed = 0
+        for message_id, user_id, entered in self.journal.replay():
+            giveaway = self.giveaways.get(message_id)
+            if not giveaway:
+                continue
+            if entered:
+                giveaway["participants"].add(user_id)
+            else:
+                giveaway["participants"].discard(user_id)
+            replayed += 1
+        if replayed:
+            print(f"Replayed {replayed} giveaway entries from {self.journal.path}")
+        self.compact_journal_now()
     
-    def save_giveaways(self):
+    def compact_journal_now(self):
+        """Synchronously write a snapshot and drop the journal it covers"""
+        self.journal.rotate()
+        if self.giveaways_store.flush(force=True):
+            self.journal.discard_rotated()
+    
+    async def compact_journal(self):
+        """Background compaction: snapshot and drop the old journal, with file I/O on worker threads.
+
+        Only the journal rename and the snapshot serialization run on the event
+        loop; the snapshot has to be taken from the in-memory giveaways there.
+        """
         try:
-            data = []
-            for giveaway in self.giveaways:
-                data.append({
-                    "channel_id": giveaway["channel_id"],
-                    "message_id": giveaway["message_id"],
-                    "prize": giveaway["prize"],
-                    "winners_count": giveaway["winners_count"],
-                    "end_time": giveaway["end_time"].isoformat(),
-                    "participants": giveaway["participants"],
-                    "host_id": giveaway["host_id"],
-                    "description": giveaway.get("description", "")
-                })
-            
-            with open(self.data_file, "w") as f:
-                json.dump(data, f, indent=4)
+            handle = self.journal.detach()
+            await asyncio.to_thread(self.journal.finish_rotation, handle)
+            # Entries made since detach() may be in both the snapshot and the new journal; replay is idempotent
+            if await self.giveaways_store.flush_async(force=True):
+                await asyncio.to_thread(self.journal.discard_rotated)
         except Exception as e:
-            print(f"Error saving giveaways: {e}")
+            print(f"Error compacting giveaway journal: {e}")
     
-    @tasks.loop(seconds=30)
-    async def check_giveaways(self):
-        now = datetime.datetime.now()
-        ended_giveaways = []
-        
+    def serialize_giveaways(self):
+        data = []
         for giveaway in self.giveaways:
-            if giveaway["end_time"] <= now:
-                ended_giveaways.append(giveaway)
-        
-        for giveaway in ended_giveaways:
-            await self.end_giveaway(giveaway)
-            self.giveaways.remove(giveaway)
-        
-        if ended_giveaways:
-            self.save_giveaways()
+            data.append({
+                "channel_id": giveaway["channel_id"],
+                "message_id": giveaway["message_id"],
+                "prize": giveaway["prize"],
+                "winners_count": giveaway["winners_count"],
+                "end_time": giveaway["end_time"].isoformat(),
+                "participants": giveaway["participants"].to_list(),
+                "host_id": giveaway["host_id"],
+                "description": giveaway.get("description", "")
+            })
+        return data
+    
+    def save_giveaways(self):
+        # Written in the background; many changes are coalesced into one write
+        self.giveaways_store.mark_dirty()
     
-    @check_giveaways.before_loop
-    async def before_check_giveaways(self):
+    async def run_scheduler(self):
         await self.bot.wait_until_ready()
+        await self.scheduler.run()
+    
+    async def end_due_giveaway(self, message_id):
+        # Whoever removes the giveaway first (scheduler or /giveaway end) ends it
+        giveaway = self.giveaways.remove(message_id)
+        if not giveaway:
+            return
+        winners, draw = await self.end_giveaway(giveaway)
+        self.archive.add(giveaway, winners, draw)
+        self.save_giveaways()
     
     async def create_giveaway(self, channel, prize, winners_count, end_time, description, host):
         # Create giveaway embed
@@ -215,14 +270,26 @@ class GiveawayCog(commands.Cog):
             "prize": prize,
             "winners_count": winners_count,
             "end_time": end_time,
-            "participants": [],
+            "participants": ParticipantSet(),
             "host_id": host.id,
             "description": description
         }
         
-        self.giveaways.append(giveaway_data)
+        self.giveaways.add(giveaway_data)
+        self.scheduler.schedule(message.id, end_time.timestamp())
         self.save_giveaways()
     
+    def draw(self, guild, participants, winners_count, message_id):
+        """Weighted draw by membership tier; the seed is logged for audits"""
+        winners, draw = draw_winners(
+            participants, winners_count, tier_weights(guild, MEMBERSHIP_ROLES, MEMBERSHIP_DRAW_WEIGHTS)
+        )
+        print(
+            f"Giveaway {message_id} draw: seed={draw['seed']} entrants={draw['entrants']} "
+            f"weighted={len(draw['weights'])} winners={winners}"
+        )
+        return winners, draw
+    
     def create_giveaway_embed(self, prize, winners_count, end_time, description, host, participants):
         embed = disnake.Embed(
             title=f"🎉 GIVEAWAY: {prize}",
@@ -233,14 +300,10 @@ class GiveawayCog(commands.Cog):
         if description:
             embed.description = description
         
-        # Add giveaway details
-        time_left = end_time - datetime.datetime.now()
-        hours, remainder = divmod(time_left.total_seconds(), 3600)
-        minutes, seconds = divmod(remainder, 60)
-        
+        # Add giveaway details; Discord keeps the relative timestamp up to date
         embed.add_field(
             name="Time Remaining:",
-            value=f"{int(hours)}h {int(minutes)}m {int(seconds)}s",
+            value=f"<t:{int(end_time.timestamp())}:R>",
             inline=True
         )
         
@@ -274,26 +337,22 @@ class GiveawayCog(commands.Cog):
         return embed
     
     async def end_giveaway(self, giveaway):
+        # A late entry-count edit must not overwrite the results
+        self.embed_updates.cancel(giveaway["message_id"])
         try:
             channel = self.bot.get_channel(giveaway["channel_id"])
             if not channel:
-                return
+                return [], None
             
             try:
                 message = await channel.fetch_message(giveaway["message_id"])
             except disnake.NotFound:
-                return
+                return [], None
             
-            participants = giveaway["participants"]
-            winners_count = giveaway["winners_count"]
+            participants = giveaway["participants"].to_list()
             
             # Draw winners
-            winners = []
-            if participants:
-                if len(participants) <= winners_count:
-                    winners = participants
-                else:
-                    winners = random.sample(participants, winners_count)
+            winners, draw = self.draw(channel.guild, participants, giveaway["winners_count"], giveaway["message_id"])
             
             # Create winner announcement embed
             embed = disnake.Embed(
@@ -324,8 +383,10 @@ class GiveawayCog(commands.Cog):
             except disnake.HTTPException:
                 pass
             
+            return winners, draw
         except Exception as e:
             print(f"Error ending giveaway: {e}")
+            return [], None
     
     @commands.Cog.listener()
     async def on_button_click(self, inter: disnake.MessageInteraction):
@@ -335,97 +396,95 @@ class GiveawayCog(commands.Cog):
             await self.handle_giveaway_info(inter)
     
     async def handle_giveaway_enter(self, inter: disnake.MessageInteraction):
-        for giveaway in self.giveaways:
-            if giveaway["message_id"] == inter.message.id:
-                user_id = inter.author.id
-                
-                if user_id in giveaway["participants"]:
-                    # User already entered, remove them
-                    giveaway["participants"].remove(user_id)
-                    await inter.response.send_message("You have been removed from the giveaway.", ephemeral=True)
-                else:
-                    # Add user to participants
-                    giveaway["participants"].append(user_id)
-                    await inter.response.send_message("You have entered the giveaway! Good luck!", ephemeral=True)
-                
-                # Update the giveaway embed
-                embed = self.create_giveaway_embed(
-                    giveaway["prize"],
-                    giveaway["winners_count"],
-                    giveaway["end_time"],
-                    giveaway.get("description", ""),
-                    giveaway["host_id"],
-                    giveaway["participants"]
-                )
-                
-                await inter.message.edit(embed=embed)
-                self.save_giveaways()
-                return
+        giveaway = self.giveaways.get(inter.message.id)
+        if not giveaway:
+            await inter.response.send_message("This giveaway is no longer active.", ephemeral=True)
+            return
+        
+        # Enter or leave the giveaway
+        entered = giveaway["participants"].toggle(inter.author.id)
+        self.journal.append(giveaway["message_id"], inter.author.id, entered)
+        if self.journal.records >= JOURNAL_COMPACT_AFTER and (not self.compaction_task or self.compaction_task.done()):
+            self.compaction_task = asyncio.create_task(self.compact_journal())
         
-        await inter.response.send_message("This giveaway is no longer active.", ephemeral=True)
+        if entered:
+            await inter.response.send_message("You have entered the giveaway! Good luck!", ephemeral=True)
+        else:
+            await inter.response.send_message("You have been removed from the giveaway.", ephemeral=True)
+        
+        # Update the giveaway embed; bursts of clicks are merged into one edit
+        message = inter.message
+        self.embed_updates.request(
+            message.id,
+            lambda: self.create_giveaway_embed(
+                giveaway["prize"],
+                giveaway["winners_count"],
+                giveaway["end_time"],
+                giveaway.get("description", ""),
+                giveaway["host_id"],
+                giveaway["participants"]
+            ),
+            lambda embed: message.edit(embed=embed)
+        )
     
     async def handle_giveaway_info(self, inter: disnake.MessageInteraction):
-        for giveaway in self.giveaways:
-            if giveaway["message_id"] == inter.message.id:
-                # Check if the user has entered
-                user_entered = inter.author.id in giveaway["participants"]
-                
-                # Create info embed
-                embed = disnake.Embed(
-                    title=f"Giveaway Info: {giveaway['prize']}",
-                    color=disnake.Color.blue()
-                )
-                
-                # Add description if available
-                if giveaway.get("description"):
-                    embed.description = giveaway["description"]
-                
-                # Add status field
-                embed.add_field(
-                    name="Your Status:",
-                    value="✅ You have entered this giveaway" if user_entered else "❌ You have not entered this giveaway",
-                    inline=False
-                )
-                
-                # Add other information
-                embed.add_field(
-                    name="Total Entries:",
-                    value=str(len(giveaway["participants"])),
-                    inline=True
-                )
-                
-                embed.add_field(
-                    name="Winners:",
-                    value=str(giveaway["winners_count"]),
-                    inline=True
-                )
-                
-                time_left = giveaway["end_time"] - datetime.datetime.now()
-                hours, remainder = divmod(time_left.total_seconds(), 3600)
-                minutes, seconds = divmod(remainder, 60)
-                
-                embed.add_field(
-                    name="Time Remaining:",
-                    value=f"{int(hours)}h {int(minutes)}m {int(seconds)}s",
-                    inline=True
-                )
-                
-                embed.add_field(
-                    name="Host:",
-                    value=f"<@{giveaway['host_id']}>",
-                    inline=True
-                )
-                
-                embed.add_field(
-                    name="Ends At:",
-                    value=f"<t:{int(giveaway['end_time'].timestamp())}:F>",
-                    inline=True
-                )
-                
-                await inter.response.send_message(embed=embed, ephemeral=True)
-                return
+        giveaway = self.giveaways.get(inter.message.id)
+        if not giveaway:
+            await inter.response.send_message("This giveaway is no longer active.", ephemeral=True)
+            return
+        
+        # Check if the user has entered
+        user_entered = inter.author.id in giveaway["participants"]
+        
+        # Create info embed
+        embed = disnake.Embed(
+            title=f"Giveaway Info: {giveaway['prize']}",
+            color=disnake.Color.blue()
+        )
+        
+        # Add description if available
+        if giveaway.get("description"):
+            embed.description = giveaway["description"]
+        
+        # Add status field
+        embed.add_field(
+            name="Your Status:",
+            value="✅ You have entered this giveaway" if user_entered else "❌ You have not entered this giveaway",
+            inline=False
+        )
         
-        await inter.response.send_message("This giveaway is no longer active.", ephemeral=True)
+        # Add other information
+        embed.add_field(
+            name="Total Entries:",
+            value=str(len(giveaway["participants"])),
+            inline=True
+        )
+        
+        embed.add_field(
+            name="Winners:",
+            value=str(giveaway["winners_count"]),
+            inline=True
+        )
+        
+        embed.add_field(
+            name="Time Remaining:",
+            value=f"<t:{int(giveaway['end_time'].timestamp())}:R>",
+            inline=True
+        )
+        
+        embed.add_field(
+            name="Host:",
+            value=f"<@{giveaway['host_id']}>",
+            inline=True
+        )
+        
+        embed.add_field(
+            name="Ends At:",
+            value=f"<t:{int(giveaway['end_time'].timestamp())}:F>",
+            inline=True
+        )
+        
+        await inter.response.send_message(embed=embed, ephemeral=True)
     
     @commands.slash_command(
         name="giveaway", 
@@ -496,15 +555,13 @@ class GiveawayCog(commands.Cog):
         except ValueError:
             return await inter.response.send_message("Invalid message ID format.", ephemeral=True)
         
-        for giveaway in self.giveaways:
-            if giveaway["message_id"] == message_id:
-                await inter.response.send_message("Ending the giveaway...", ephemeral=True)
-                await self.end_giveaway(giveaway)
-                self.giveaways.remove(giveaway)
-                self.save_giveaways()
-                return
-        
-        await inter.response.send_message("Giveaway not found. Make sure you entered the correct message ID.", ephemeral=True)
+        giveaway = self.giveaways.get(message_id)
+        if not giveaway:
+            return await inter.response.send_message("Giveaway not found. Make sure you entered the correct message ID.", ephemeral=True)
+        
+        await inter.response.send_message("Ending the giveaway...", ephemeral=True)
+        self.scheduler.cancel(message_id)
+        await self.end_due_giveaway(message_id)
     
     @giveaway.sub_command(
         name="reroll", 
@@ -522,45 +579,42 @@ class GiveawayCog(commands.Cog):
         except ValueError:
             return await inter.response.send_message("Invalid message ID format.", ephemeral=True)
         
-        # Load all giveaways from the file, including ended ones
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, "r") as f:
-                    all_giveaways = json.load(f)
-                
-                for giveaway_data in all_giveaways:
-                    if giveaway_data["message_id"] == message_id:
-                        # Found the giveaway
-                        channel = self.bot.get_channel(giveaway_data["channel_id"])
-                        if not channel:
-                            return await inter.response.send_message("Channel not found.", ephemeral=True)
-                        
-                        participants = giveaway_data["participants"]
-                        if not participants:
-                            return await inter.response.send_message("No one entered that giveaway.", ephemeral=True)
-                        
-                        # Limit winners count
-                        if winners_count > len(participants):
-                            winners_count = len(participants)
-                        
-                        # Draw new winners
-                        new_winners = random.sample(participants, winners_count)
-                        winners_mention = ", ".join([f"<@{winner}>" for winner in new_winners])
-                        
-                        await inter.response.send_message(f"Rerolling winners for **{giveaway_data['prize']}**...", ephemeral=True)
-                        
-                        # Send new winners announcement
-                        await channel.send(
-                            f"🎊 **GIVEAWAY REROLL!** 🎊\n\n"
-                            f"New winner{'s' if winners_count > 1 else ''} for **{giveaway_data['prize']}**: {winners_mention}\n"
-                            f"Congratulations!"
-                        )
-                        
-                        return
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"Error loading giveaways for reroll: {e}")
-        
-        await inter.response.send_message("Giveaway not found. Make sure you entered the correct message ID.", ephemeral=True)
+        giveaway_data = self.archive.get(message_id)
+        if not giveaway_data:
+            if self.giveaways.get(message_id):
+                return await inter.response.send_message("That giveaway has not ended yet.", ephemeral=True)
+            return await inter.response.send_message("Giveaway not found. Make sure you entered the correct message ID.", ephemeral=True)
+        
+        channel = self.bot.get_channel(giveaway_data["channel_id"])
+        if not channel:
+            return await inter.response.send_message("Channel not found.", ephemeral=True)
+        
+        if not giveaway_data["participants"]:
+            return await inter.response.send_message("No one entered that giveaway.", ephemeral=True)
+        
+        # Previous winners (including earlier rerolls) cannot win again
+        previous_winners = set(giveaway_data["winners"])
+        participants = [p for p in giveaway_data["participants"] if p not in previous_winners]
+        if not participants:
+            return await inter.response.send_message("Every participant has already won this giveaway.", ephemeral=True)
+        
+        # Limit winners count
+        if winners_count > len(participants):
+            winners_count = len(participants)
+        
+        # Draw new winners
+        new_winners, draw = self.draw(channel.guild, participants, winners_count, message_id)
+        self.archive.record_winners(message_id, new_winners, draw)
+        winners_mention = ", ".join([f"<@{winner}>" for winner in new_winners])
+        
+        await inter.response.send_message(f"Rerolling winners for **{giveaway_data['prize']}**...", ephemeral=True)
+        
+        # Send new winners announcement
+        await channel.send(
+            f"🎊 **GIVEAWAY REROLL!** 🎊\n\n"
+            f"New winner{'s' if winners_count > 1 else ''} for **{giveaway_data['prize']}**: {winners_mention}\n"
+            f"Congratulations!"
+        )
 
 def setup(bot):
     bot.add_cog(GiveawayCog(bot))
\ No newline at end of file
@@ -4,7 +4,7 @@ import asyncio
 import json
 import datetime
 from typing import Optional, Union
-from main import ADMIN_ROLE_ID
+from common import ADMIN_ROLE_ID
 
 
 class Misc(commands.Cog):
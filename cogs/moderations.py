@@ -4,7 +4,8 @@ import asyncio
 import json
 import datetime
 from typing import Optional, Union
-from main import ADMIN_ROLE_ID
+from common import ADMIN_ROLE_ID, PERSIST_FLUSH_INTERVAL
+from services.persistence import DebouncedJSONFile
 
 
 class Moderations(commands.Cog):
@@ -13,8 +14,12 @@ class Moderations(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.warnings = {}
+        self.warnings_store = DebouncedJSONFile("database/warnings.json", lambda: self.warnings, PERSIST_FLUSH_INTERVAL)
         self.load_warnings()
     
+    def cog_unload(self):
+        self.warnings_store.flush()
+    
     def load_warnings(self):
         try:
             with open("database/warnings.json", "r") as f:
@@ -24,8 +29,7 @@ class Moderations(commands.Cog):
             self.save_warnings()
     
     def save_warnings(self):
-        with open("database/warnings.json", "w") as f:
-            json.dump(self.warnings, f, indent=4)
+        self.warnings_store.mark_dirty()
     
     def has_admin_role():
         async def predicate(inter):
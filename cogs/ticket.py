@@ -4,8 +4,14 @@ import asyncio
 import json
 import datetime
 import os
+import sqlite3
 from typing import Optional, Union
-from main import ADMIN_ROLE_ID, MEMBERSHIP_ROLES, save_json, load_json
+from common import ADMIN_ROLE_ID, MEMBERSHIP_ROLES, PERSIST_FLUSH_INTERVAL, load_json
+from services.persistence import DebouncedJSONFile
+from services.ticket_log import TicketMessageLog
+from services.ticket_index import TicketIndex
+from services.transcript import render_transcript
+from services.ticket_search import TicketSearchIndex
 
 class TicketDropdown(disnake.ui.StringSelect):
     def __init__(self):
@@ -52,7 +58,72 @@ class TicketSystem(commands.Cog):
         self.tickets_file = "database/tickets.json"
         self.products_file = "database/product.json"
         self.ticket_logs_channel_id = 1368178718757093406
+        self.tickets_store = DebouncedJSONFile(self.tickets_file, lambda: self.tickets_data, PERSIST_FLUSH_INTERVAL)
+        # Ticket messages live in per-ticket append-only segments, not in tickets.json
+        self.message_log = TicketMessageLog("database/tickets")
+        self.index = TicketIndex()
+        # Last message id seen in each open ticket channel (logged or not)
+        self.last_seen = {}
+        # Background indexing of just-closed tickets; referenced here so they are not garbage-collected
+        self.index_tasks = set()
         self.load_tickets()
+        
+        # Full-text index over closed tickets (requires SQLite with FTS5)
+        try:
+            self.search_index = TicketSearchIndex("database/ticket_search.db")
+            self.backfill_task = self.bot.loop.create_task(self.backfill_search_index())
+        except sqlite3.OperationalError as e:
+            print(f"Ticket search disabled: {e}")
+            self.search_index = None
+            self.backfill_task = None
+    
+    def cog_unload(self):
+        self.tickets_store.flush()
+        self.message_log.close()
+        if self.backfill_task:
+            self.backfill_task.cancel()
+        for task in self.index_tasks:
+            task.cancel()
+        if self.search_index:
+            self.search_index.close()
+    
+    async def index_closed_ticket(self, guild_id, ticket):
+        """Add a closed ticket to the search index on a worker thread"""
+        if not self.search_index:
+            return
+        def index_ticket():
+            # Reading and parsing the segment happens on the worker thread too
+            records = list(self.get_ticket_messages(guild_id, ticket["ticket_id"]))
+            self.search_index.index_ticket(guild_id, ticket, records, ticket.get("transcript_url"))
+        
+        try:
+            await asyncio.to_thread(index_ticket)
+        except Exception as e:
+            print(f"Error indexing ticket #{ticket['ticket_id']}: {e}")
+    
+    def schedule_index(self, guild_id, ticket):
+        """Index a closed ticket in the background, keeping a reference to the task"""
+        task = asyncio.create_task(self.index_closed_ticket(guild_id, ticket))
+        self.index_tasks.add(task)
+        task.add_done_callback(self._index_task_done)
+    
+    def _index_task_done(self, task):
+        self.index_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"Error in ticket indexing task: {task.exception()}")
+    
+    async def backfill_search_index(self):
+        """Index closed tickets that are not in the search index yet"""
+        await self.bot.wait_until_ready()
+        indexed = await asyncio.to_thread(self.search_index.indexed_tickets)
+        count = 0
+        for guild_id, guild_data in list(self.tickets_data.items()):
+            for ticket_id, ticket in list(guild_data.get("tickets", {}).items()):
+                if ticket["status"] == "closed" and (guild_id, ticket_id) not in indexed:
+                    await self.index_closed_ticket(guild_id, ticket)
+                    count += 1
+        if count:
+            print(f"Indexed {count} closed tickets for search")
     
     def load_tickets(self):
         """Load tickets data from file"""
@@ -60,10 +131,31 @@ class TicketSystem(commands.Cog):
         
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(self.tickets_file), exist_ok=True)
+        
+        # Move messages still embedded in tickets.json into their segments
+        migrated = 0
+        for guild_id, guild_data in self.tickets_data.items():
+            for ticket_id, ticket in guild_data.get("tickets", {}).items():
+                messages = ticket.pop("messages", None)
+                if messages is None:
+                    continue
+                if messages and not self.message_log.exists(guild_id, ticket_id):
+                    self.message_log.extend(guild_id, ticket_id, messages)
+                migrated += 1
+        if migrated:
+            self.message_log.sync()
+            self.save_tickets()
+            print(f"Moved messages of {migrated} tickets into {self.message_log.base_dir}")
+        
+        self.index.rebuild(self.tickets_data)
+    
+    def get_ticket_messages(self, guild_id, ticket_id):
+        """Lazily iterate over the stored messages of a ticket"""
+        return self.message_log.read(guild_id, ticket_id)
     
     def save_tickets(self):
-        """Save tickets data to file"""
-        save_json(self.tickets_file, self.tickets_data)
+        """Mark tickets data as changed; it is written to file in the background"""
+        self.tickets_store.mark_dirty()
     
     def load_products(self):
         """Load products data from file"""
@@ -129,13 +221,12 @@ class TicketSystem(commands.Cog):
             self.tickets_data[guild_id] = {"tickets": {}, "counter": 0}
         
         # Check if user already has an open ticket
-        for ticket_id, ticket in self.tickets_data[guild_id]["tickets"].items():
-            if ticket["user_id"] == user_id and ticket["status"] == "open":
-                await inter.response.send_message(
-                    f"Bạn đã có một ticket đang mở. Vui lòng sử dụng ticket hiện có.",
-                    ephemeral=True
-                )
-                return
+        if self.index.open_ticket_for_user(guild_id, user_id):
+            await inter.response.send_message(
+                f"Bạn đã có một ticket đang mở. Vui lòng sử dụng ticket hiện có.",
+                ephemeral=True
+            )
+            return
         
         # Create new ticket
         ticket_number = self.tickets_data[guild_id]["counter"] + 1
@@ -166,10 +257,12 @@ class TicketSystem(commands.Cog):
             "issue": issue_description,
             "status": "open",
             "created_at": datetime.datetime.now().isoformat(),
-            "messages": []
+            # Log records carry message ids, avatars and bot embeds
+            "log_version": 2
         }
         
         self.tickets_data[guild_id]["tickets"][str(ticket_number)] = ticket_data
+        self.index.add(guild_id, str(ticket_number), ticket_data)
         self.save_tickets()
         
         # Create welcome embed
@@ -208,94 +301,101 @@ class TicketSystem(commands.Cog):
             )
         )
     
-    async def create_ticket_transcript(self, channel, ticket_data):
-        """Create HTML transcript of ticket conversation"""
-        messages = []
-        async for message in channel.history(limit=500, oldest_first=True):
+    async def history_messages(self, channel):
+        """Page through the full channel history as transcript message dicts"""
+        async for message in channel.history(limit=None, oldest_first=True):
             if message.author.bot and not message.embeds:
                 continue
-                
-            timestamp = message.created_at.strftime("%Y-%m-%d %H:%M:%S")
-            
-            if message.embeds:
-                for embed in message.embeds:
-                    content = f"<div class='embed'><div class='embed-title'>{embed.title or ''}</div>"
-                    if embed.description:
-                        content += f"<div class='embed-description'>{embed.description}</div>"
-                    for field in embed.fields:
-                        content += f"<div class='embed-field'><div class='field-name'>{field.name}</div><div class='field-value'>{field.value}</div></div>"
-                    content += "</div>"
-                    
-                    messages.append({
-                        "author": message.author.display_name,
-                        "avatar": str(message.author.display_avatar.url),
-                        "content": content,
-                        "timestamp": timestamp
-                    })
-            else:
-                messages.append({
-                    "author": message.author.display_name,
-                    "avatar": str(message.author.display_avatar.url),
-                    "content": message.content,
-                    "timestamp": timestamp
-                })
-        
-        # Create HTML
-        html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Ticket #{ticket_data['ticket_id']} - {ticket_data['category']}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f5f5f5; }}
-        .container {{ max-width: 800px; margin: 0 auto; background-color: white; border-radius: 5px; padding: 20px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-        .header {{ border-bottom: 1px solid #eee; padding-bottom: 10px; margin-bottom: 20px; }}
-        .message {{ display: flex; margin-bottom: 15px; }}
-        .avatar {{ width: 40px; height: 40px; border-radius: 50%; margin-right: 10px; }}
-        .message-content {{ flex: 1; }}
-        .message-header {{ display: flex; align-items: center; margin-bottom: 5px; }}
-        .author-name {{ font-weight: bold; margin-right: 10px; }}
-        .timestamp {{ color: #999; font-size: 0.8em; }}
-        .message-text {{ background-color: #f9f9f9; padding: 10px; border-radius: 5px; }}
-        .embed {{ background-color: #f0f0f0; border-left: 4px solid #7289da; padding: 10px; margin-top: 5px; }}
-        .embed-title {{ font-weight: bold; margin-bottom: 5px; }}
-        .embed-description {{ margin-bottom: 10px; }}
-        .embed-field {{ margin-top: 5px; }}
-        .field-name {{ font-weight: bold; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h2>Ticket #{ticket_data['ticket_id']} - {ticket_data['category']}</h2>
-            <p><strong>Issue:</strong> {ticket_data['issue']}</p>
-            <p><strong>Created:</strong> {datetime.datetime.fromisoformat(ticket_data['created_at']).strftime('%Y-%m-%d %H:%M:%S')}</p>
-            <p><strong>Closed:</strong> {datetime.datetime.fromisoformat(ticket_data['closed_at']).strftime('%Y-%m-%d %H:%M:%S')}</p>
-        </div>
-        <div class="messages">
-"""
-        
-        for msg in messages:
-            html += f"""
-            <div class="message">
-                <img class="avatar" src="{msg['avatar']}" alt="{msg['author']}">
-                <div class="message-content">
-                    <div class="message-header">
-                        <div class="author-name">{msg['author']}</div>
-                        <div class="timestamp">{msg['timestamp']}</div>
-                    </div>
-                    <div class="message-text">{msg['content']}</div>
-                </div>
-            </div>
-"""
-        
-        html += """
-        </div>
-    </div>
-</body>
-</html>
-"""
-        return html
+            yield self.record_to_message(self.history_message_to_record(message))
+    
+    @staticmethod
+    def history_message_to_record(message):
+        """Convert a disnake message into a ticket log record"""
+        return {
+            "id": str(message.id),
+            "author_id": str(message.author.id),
+            "author_name": message.author.display_name,
+            "avatar": str(message.author.display_avatar.url),
+            "content": message.content,
+            "embeds": [
+                {
+                    "title": embed.title,
+                    "description": embed.description,
+                    "fields": [{"name": field.name, "value": field.value} for field in embed.fields]
+                }
+                for embed in message.embeds
+            ],
+            "timestamp": message.created_at.isoformat()
+        }
+    
+    @staticmethod
+    def record_to_message(record):
+        """Convert a ticket log record into a transcript message dict"""
+        return {
+            "author": record.get("author_name", ""),
+            "avatar": record.get("avatar", ""),
+            "timestamp": datetime.datetime.fromisoformat(record["timestamp"]).strftime("%Y-%m-%d %H:%M:%S"),
+            "content": record.get("content", ""),
+            "embeds": record.get("embeds", [])
+        }
+    
+    def last_logged_id(self, guild_id, ticket_number):
+        """Id of the newest record in a ticket's segment (reads the whole segment)"""
+        last_logged = None
+        for record in self.get_ticket_messages(guild_id, ticket_number):
+            last_logged = record.get("id", last_logged)
+        return last_logged
+    
+    async def log_gap_start(self, channel, guild_id, ticket_number):
+        """Return the message id after which the local log may be missing messages.
+        
+        None means the log is complete: every message the channel has seen
+        passed through on_message while the bot was running.
+        """
+        if self.tickets_data[guild_id]["tickets"][ticket_number].get("log_version") != 2:
+            return None
+        
+        last_seen = self.last_seen.get(channel.id)
+        if last_seen is not None and channel.last_message_id == last_seen:
+            return None
+        if last_seen is not None:
+            return last_seen
+        
+        # The bot restarted since the last message, so look past the last record
+        last_logged = await asyncio.to_thread(self.last_logged_id, guild_id, ticket_number)
+        if last_logged is not None and channel.last_message_id == int(last_logged):
+            return None
+        return int(last_logged) if last_logged else 0
+    
+    async def log_messages(self, channel, guild_id, ticket_number, gap_start):
+        """Transcript messages from the local log, filling any gap from the history API"""
+        for record in self.get_ticket_messages(guild_id, ticket_number):
+            yield self.record_to_message(record)
+        
+        if gap_start is None:
+            return
+        
+        print(f"Ticket #{ticket_number}: fetching history after {gap_start} to fill a log gap")
+        async for message in channel.history(limit=None, after=disnake.Object(id=gap_start), oldest_first=True):
+            if message.author.bot and not message.embeds:
+                continue
+            yield self.record_to_message(self.history_message_to_record(message))
+    
+    async def create_ticket_transcript(self, channel, ticket_data, filename, compress=None, gap_start=None):
+        """Create HTML transcript of ticket conversation"""
+        guild_id = str(channel.guild.id)
+        if ticket_data.get("log_version") == 2:
+            messages = self.log_messages(channel, guild_id, ticket_data["ticket_id"], gap_start)
+        else:
+            # Tickets opened before bot messages were logged
+            messages = self.history_messages(channel)
+        
+        transcript = await render_transcript(ticket_data, messages, filename, compress)
+        print(
+            f"Rendered transcript {transcript.filename}: {transcript.message_count} messages, "
+            f"{transcript.size:,} bytes in {transcript.render_ms:.0f} ms"
+        )
+        return transcript
     
     @commands.Cog.listener()
     async def on_button_click(self, inter: disnake.MessageInteraction):
@@ -322,11 +422,17 @@ class TicketSystem(commands.Cog):
             await inter.response.send_message("Bạn không có quyền đóng ticket này.", ephemeral=True)
             return
         
+        # Check whether the local log covers the whole channel before posting anything
+        gap_start = await self.log_gap_start(inter.channel, guild_id, ticket_number)
+        self.last_seen.pop(inter.channel.id, None)
+        
         # Close the ticket
         ticket["status"] = "closed"
         ticket["closed_at"] = datetime.datetime.now().isoformat()
         ticket["closed_by"] = str(inter.author.id)
+        self.index.close(guild_id, ticket_number, ticket)
         self.save_tickets()
+        self.message_log.close_ticket(guild_id, ticket_number)
         
         # Send confirmation message
         await inter.response.send_message(f"Ticket #{ticket_number} đã được đóng bởi {inter.author.mention}.")
@@ -340,13 +446,12 @@ class TicketSystem(commands.Cog):
         )
         transcript_embed.add_field(name="Vấn đề", value=ticket["issue"], inline=False)
         
-        # Create HTML transcript
-        html_transcript = await self.create_ticket_transcript(inter.channel, ticket)
-        
-        # Save transcript to file
-        transcript_filename = f"ticket_{guild_id}_{ticket_number}.html"
-        with open(transcript_filename, "w", encoding="utf-8") as f:
-            f.write(html_transcript)
+        # Render HTML transcript into an in-memory (spooled) buffer
+        transcript = await self.create_ticket_transcript(
+            inter.channel, ticket, f"ticket_{guild_id}_{ticket_number}.html", gap_start=gap_start
+        )
+        ticket["transcript"] = transcript.metrics()
+        self.save_tickets()
         
         # Send transcript to logs channel
         logs_channel = self.bot.get_channel(self.ticket_logs_channel_id)
@@ -363,13 +468,14 @@ class TicketSystem(commands.Cog):
             log_embed.add_field(name="Người tạo", value=user_mention, inline=True)
             log_embed.add_field(name="Vấn đề", value=ticket["issue"][:1024], inline=False)
             
-            await logs_channel.send(embed=log_embed, file=disnake.File(transcript_filename))
+            log_message = await logs_channel.send(embed=log_embed, file=disnake.File(transcript.file, filename=transcript.filename))
+            ticket["transcript_url"] = log_message.jump_url
+            self.save_tickets()
         
-        # Delete the temporary file
-        try:
-            os.remove(transcript_filename)
-        except Exception as e:
-            print(f"Error removing transcript file: {e}")
+        transcript.file.close()
+        
+        # Index the closed ticket for /tickets search in the background
+        self.schedule_index(guild_id, ticket)
         
         # Notify user that channel will be deleted
         await inter.channel.send("Kênh này sẽ bị xóa sau 5 giây.")
@@ -384,40 +490,35 @@ class TicketSystem(commands.Cog):
     @commands.Cog.listener()
     async def on_message(self, message):
         """Listen for messages in ticket channels"""
-        # Ignore bot messages
-        if message.author.bot:
-            return
-        
         # Check if message is in a ticket channel
         if not message.guild or not message.channel.name.startswith("ticket-"):
             return
         
         # Find ticket data
-        guild_id = str(message.guild.id)
-        if guild_id not in self.tickets_data:
+        found = self.index.ticket_for_channel(message.channel.id)
+        if not found:
+            return
+        
+        guild_id, ticket_number = found
+        if self.tickets_data[guild_id]["tickets"][ticket_number]["status"] != "open":
             return
         
-        ticket_number = None
-        for t_num, ticket in self.tickets_data[guild_id]["tickets"].items():
-            if str(message.channel.id) == ticket["channel_id"] and ticket["status"] == "open":
-                ticket_number = t_num
-                break
+        self.last_seen[message.channel.id] = message.id
         
-        if not ticket_number:
+        # Bot messages are only kept for their embeds
+        if message.author.bot and not message.embeds:
             return
         
-        # Store message in ticket history
-        ticket = self.tickets_data[guild_id]["tickets"][ticket_number]
-        ticket["messages"].append({
-            "author_id": str(message.author.id),
-            "author_name": message.author.display_name,
-            "content": message.content,
-            "timestamp": datetime.datetime.now().isoformat()
-        })
-        self.save_tickets()
+        # Append message to the ticket's log segment
+        self.message_log.append(guild_id, ticket_number, self.history_message_to_record(message))
     
-    @commands.slash_command(name="tickets", description="View all active tickets")
+    @commands.slash_command(name="tickets", description="Ticket management commands")
     @has_admin_role()
+    async def tickets(self, inter: disnake.ApplicationCommandInteraction):
+        # This is a group command - subcommands will handle the functionality
+        pass
+    
+    @tickets.sub_command(name="list", description="View all active tickets")
     async def view_tickets(self, inter: disnake.ApplicationCommandInteraction):
         """View all active tickets (Admin only)"""
         guild_id = str(inter.guild.id)
@@ -456,6 +557,41 @@ class TicketSystem(commands.Cog):
             embed.description = "Hiện tại không có ticket nào đang hoạt động."
         
         await inter.response.send_message(embed=embed, ephemeral=True)
+    
+    @tickets.sub_command(name="search", description="Search closed tickets and their messages")
+    async def search_tickets(
+        self,
+        inter: disnake.ApplicationCommandInteraction,
+        query: str = commands.Param(description="Words to search for"),
+        limit: int = commands.Param(description="Maximum number of results", default=5, ge=1, le=10)
+    ):
+        """Search closed tickets (Admin only)"""
+        if not self.search_index:
+            await inter.response.send_message("Tìm kiếm ticket không khả dụng trên máy chủ này.", ephemeral=True)
+            return
+        
+        await inter.response.defer(ephemeral=True)
+        hits = await asyncio.to_thread(self.search_index.search, str(inter.guild.id), query, limit)
+        
+        if not hits:
+            await inter.edit_original_message(content=f"Không tìm thấy ticket nào khớp với `{query}`.")
+            return
+        
+        embed = disnake.Embed(
+            title=f"Kết quả tìm kiếm: {query}"[:256],
+            color=disnake.Color.blue(),
+            timestamp=datetime.datetime.now()
+        )
+        for hit in hits:
+            closed = hit["closed_at"][:10] if hit["closed_at"] else "?"
+            link = f"\n[Xem transcript]({hit['jump_url']})" if hit["jump_url"] else ""
+            embed.add_field(
+                name=f"Ticket #{hit['ticket_id']} - {hit['category']} ({closed})",
+                value=f"Người dùng: <@{hit['user_id']}>\n{hit['snippet'][:800]}{link}",
+                inline=False
+            )
+        
+        await inter.edit_original_message(embed=embed)
 
 
 def setup(bot):
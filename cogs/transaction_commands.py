@@ -5,19 +5,270 @@ import json
 import asyncio
 from datetime import datetime
 import sys
-import os
-import requests
+import aiohttp
+import time
 
 # Add the dev directory to the path for importing license key generator
 sys.path.append('dev')
 from lisenceKey import generate_license_key
 
-# Import common utilities from main
-from main import load_json, save_json, get_item_by_attribute, USERS_PATH, PRODUCT_PATH, load_json_from_web
+# Import common utilities
+from common import USERS_PATH, USERS_DB_PATH, USER_STORE_BACKEND, ORDERS_DB_PATH
+from common import PERSIST_FLUSH_INTERVAL, PRODUCT_STORAGE_CHANNEL_ID, ATTACHMENT_CACHE_PATH, PRODUCTS_DIR
+from common import RELEASES_DB_PATH, RELEASE_SENDS_PER_SECOND
+from common import (
+    DOWNLOAD_SERVER_ENABLED, DOWNLOAD_SERVER_HOST, DOWNLOAD_SERVER_PORT, DOWNLOAD_BASE_URL, DOWNLOAD_SECRET,
+    DOWNLOAD_LINK_TTL, DOWNLOAD_MAX_PER_LINK, DOWNLOAD_COUNTS_PATH
+)
+from services.user_store import open_user_store
+from services.order_store import OrderStore
+from services.channel_pool import ChannelPool
+from services.order_guard import OrderGuard
+from services.attachment_cache import AttachmentCache, url_expires_at
+from services.download_server import DownloadServer
+from services.release_fanout import ReleaseFanout
+
+# Seconds before a completed order channel is archived
+ORDER_ARCHIVE_DELAY = 300
+# Seconds before a cancelled order channel is renamed, so the notice can be read
+CANCEL_RENAME_DELAY = 3
+# Hidden order channels kept ready in the Transactions category
+ORDER_POOL_SIZE = 5
+# New orders per user: a burst of ORDER_BURST, then one per ORDER_REFILL_SECONDS
+ORDER_BURST = 3
+ORDER_REFILL_SECONDS = 300
+# Runs of a delivery job before it is moved to the dead-letter list
+DELIVERY_MAX_ATTEMPTS = 5
+
+def is_transient_error(error):
+    """429s, 5xx responses and network errors are retried; anything else is dead-lettered"""
+    if isinstance(error, disnake.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError))
+
+def describe_job(job):
+    """Short target of a job for staff listings"""
+    payload = job["payload"]
+    if "channel_id" in payload:
+        return f"<#{payload['channel_id']}>"
+    if "user_id" in payload:
+        return f"<@{payload['user_id']}> {payload.get('product', '')}"
+    return ""
 
 class TransactionCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.users = open_user_store(USER_STORE_BACKEND, USERS_PATH, USERS_DB_PATH)
+        self.orders = OrderStore(ORDERS_DB_PATH)
+        # Delayed channel actions are persisted jobs rather than sleeping handlers
+        self.bot.jobs.register("archive_channel", self.archive_channel_job)
+        self.bot.jobs.register("rename_channel", self.rename_channel_job)
+        self.bot.jobs.register("delete_channel", self.delete_channel_job)
+        self.bot.jobs.register("deliver_product", self.deliver_product_job, DELIVERY_MAX_ATTEMPTS, is_transient_error)
+        self.pool = ChannelPool(bot, "Transactions", "Staff", ORDER_POOL_SIZE)
+        self.guard = OrderGuard(ORDER_BURST, ORDER_REFILL_SECONDS)
+        self.attachments = AttachmentCache(bot, PRODUCT_STORAGE_CHANNEL_ID, ATTACHMENT_CACHE_PATH, PERSIST_FLUSH_INTERVAL)
+        self.downloads = None
+        if DOWNLOAD_SERVER_ENABLED:
+            if DOWNLOAD_SECRET:
+                self.downloads = DownloadServer(
+                    DOWNLOAD_SERVER_HOST, DOWNLOAD_SERVER_PORT, DOWNLOAD_BASE_URL, DOWNLOAD_SECRET,
+                    PRODUCTS_DIR, self.license_for, DOWNLOAD_LINK_TTL, DOWNLOAD_MAX_PER_LINK,
+                    DOWNLOAD_COUNTS_PATH, PERSIST_FLUSH_INTERVAL
+                )
+            else:
+                print("DOWNLOAD_SECRET is not set; the download server is disabled")
+        self.release_files = {}
+        self.releases = ReleaseFanout(
+            RELEASES_DB_PATH, self.users.owners_of, self.send_release_notice,
+            is_transient_error, RELEASE_SENDS_PER_SECOND
+        )
+    
+    def cog_unload(self):
+        self.users.close()
+        self.orders.close()
+        self.releases.close()
+        self.attachments.flush()
+        if self.downloads:
+            self.bot.loop.create_task(self.downloads.stop())
+    
+    def order_buyer_id(self, channel):
+        """Buyer of the order in a transaction channel, or None if it is not one"""
+        order = self.orders.for_channel(channel.id)
+        if order:
+            return order["buyer_id"]
+        # Channels opened before orders were recorded only carry the buyer in their name
+        parts = channel.name.split("-")
+        if channel.name.startswith("order-") and len(parts) >= 2 and parts[1].isdigit():
+            return int(parts[1])
+        return None
+    
+    def open_order_channel(self, guild, buyer_id, product):
+        """Channel of the buyer's open order for a product, if it still exists"""
+        for order in self.orders.for_buyer(buyer_id):
+            if order["status"] == "open" and order["product"] == product:
+                channel = guild.get_channel(order["channel_id"])
+                if channel:
+                    return channel
+        return None
+    
+    async def update_order(self, channel, **fields):
+        """Update the order record of a transaction channel, if it has one"""
+        order = self.orders.for_channel(channel.id)
+        if order:
+            await asyncio.to_thread(self.orders.update, order["order_id"], **fields)
+    
+    # Job handlers; a job may run twice after a restart, so each is idempotent
+    async def archive_channel_job(self, payload):
+        channel = self.bot.get_channel(payload["channel_id"])
+        if channel is None or channel.name.startswith("✓-"):
+            return
+        try:
+            await channel.edit(name=f"✓-{channel.name}")
+        except disnake.HTTPException:
+            # If archiving fails, try deleting
+            await channel.delete(reason="Transaction completed")
+        await self.update_order(channel, status="archived")
+    
+    async def rename_channel_job(self, payload):
+        channel = self.bot.get_channel(payload["channel_id"])
+        if channel is not None and channel.name != payload["name"]:
+            await channel.edit(name=payload["name"])
+    
+    async def delete_channel_job(self, payload):
+        channel = self.bot.get_channel(payload["channel_id"])
+        if channel is not None:
+            await channel.delete(reason=payload.get("reason"))
+    
+    async def license_for(self, user_id, product):
+        """The buyer's current license key for a product; download links are checked against it"""
+        user = await asyncio.to_thread(self.users.get_user, user_id)
+        return user["ownership"].get(product) if user else None
+    
+    async def manifest_entry(self, filename):
+        """Manifest entry for a product file, re-scanning once if it was added since the last poll"""
+        manifest = self.bot.manifest
+        file_entry = manifest.get(filename)
+        if file_entry is None:
+            await manifest.scan()
+            file_entry = manifest.get(filename)
+        return file_entry
+    
+    async def release_file(self, release):
+        """(filename, manifest entry) attached to a release's notices, looked up once per release"""
+        cached = self.release_files.get(release["release_id"])
+        if cached is None:
+            filename = self.bot.catalog.products.get(release["product"], {}).get("filename")
+            file_entry = await self.manifest_entry(filename) if filename else None
+            if file_entry is None:
+                print(f"Release {release['release_id']}: no file for {release['product']}, sending notes only")
+            # Releases run one at a time, so only the current one is kept
+            cached = (filename, file_entry)
+            self.release_files = {release["release_id"]: cached}
+        return cached
+    
+    async def enqueue_delivery(self, user_id, product, license_key, filename, free):
+        """Queue the license DM and product file for a buyer"""
+        return await self.bot.jobs.enqueue("deliver_product", {
+            "user_id": int(user_id),
+            "product": product,
+            "license_key": license_key,
+            "filename": filename,
+            "free": free
+        })
+    
+    async def deliver_product_job(self, payload):
+        full_product_path = f"{PRODUCTS_DIR}/{payload['filename']}"
+        file_entry = await self.manifest_entry(payload["filename"])
+        if file_entry is None:
+            raise FileNotFoundError(f"Product file not found at path: {full_product_path}")
+        
+        user = self.bot.get_user(payload["user_id"]) or await self.bot.fetch_user(payload["user_id"])
+        
+        # Create license info message
+        license_embed = disnake.Embed(
+            title=f"Purchased Product: {payload['product']}",
+            description=(
+                "Thank you for your download! Here is your license information:" if payload["free"]
+                else "Thank you for your purchase! Here is your license information:"
+            ),
+            color=disnake.Color.green()
+        )
+        license_embed.add_field(name="License Key", value=f"`{payload['license_key']}`")
+        license_embed.add_field(name="Product", value=payload["product"])
+        license_embed.add_field(name="SHA-256", value=f"`{file_entry['sha256']}`", inline=False)
+        license_embed.set_footer(
+            text="Keep this license key safe as it confirms your ownership." if payload["free"]
+            else "Keep this license key safe as it confirms your purchase."
+        )
+        
+        url = await self.download_url(
+            payload["user_id"], payload["product"], payload["license_key"], payload["filename"], file_entry["sha256"]
+        )
+        if url:
+            self.add_download_field(license_embed, payload["filename"], url)
+            await user.send(embed=license_embed)
+            return
+        
+        # License info and file go in one message, so a retry never sends half a delivery
+        await user.send(embed=license_embed, file=disnake.File(full_product_path))
+    
+    async def download_url(self, user_id, product, license_key, filename, sha256):
+        """Link to a product file, or None if it has to be attached to the DM"""
+        # With the download server enabled, buyers get a signed link to the file
+        if self.downloads:
+            return self.downloads.make_link(user_id, product, license_key, filename)
+        # Link to the copy in the storage channel instead of uploading the file again
+        try:
+            return await self.attachments.url_for(f"{PRODUCTS_DIR}/{filename}", sha256)
+        except disnake.HTTPException as e:
+            print(f"Error uploading {filename} to the storage channel: {e}")
+            return None
+    
+    def add_download_field(self, embed, filename, url):
+        embed.add_field(name="Download", value=f"[{filename}]({url})", inline=False)
+        # Storage channel links are signed CDN links with their own expiry
+        expires_at = time.time() + DOWNLOAD_LINK_TTL if self.downloads else url_expires_at(url)
+        if expires_at:
+            embed.add_field(name="Link Expires", value=f"<t:{int(expires_at)}:R>")
+    
+    async def send_release_notice(self, user_id, release):
+        """DM one owner about a product update; called by the release fan-out"""
+        user = self.bot.get_user(int(user_id)) or await self.bot.fetch_user(int(user_id))
+        embed = disnake.Embed(
+            title=f"Update: {release['product']}",
+            description=release["message"],
+            color=disnake.Color.blue()
+        )
+        embed.set_footer(text="You are receiving this because you own this product.")
+        
+        file_entry = None
+        if release["include_file"]:
+            filename, file_entry = await self.release_file(release)
+        if file_entry is None:
+            await user.send(embed=embed)
+            return
+        
+        embed.add_field(name="SHA-256", value=f"`{file_entry['sha256']}`", inline=False)
+        license_key = await self.license_for(int(user_id), release["product"])
+        url = await self.download_url(int(user_id), release["product"], license_key or "", filename, file_entry["sha256"])
+        if url:
+            self.add_download_field(embed, filename, url)
+            await user.send(embed=embed)
+            return
+        await user.send(embed=embed, file=disnake.File(f"{PRODUCTS_DIR}/{filename}"))
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Channel and role caches are only complete once the gateway is ready
+        self.pool.start()
+        # Resumes any release interrupted by a restart
+        self.releases.start()
+        if self.downloads:
+            try:
+                await self.downloads.start()
+            except OSError as e:
+                print(f"Error starting download server: {e}")
     
     # Handle buy button clicks
     @commands.Cog.listener("on_button_click")
@@ -28,8 +279,8 @@ class TransactionCommands(commands.Cog):
         # Extract product name from button custom_id
         product_name = inter.component.custom_id.split(":", 1)[1]
         
-        # Load product data
-        products = load_json_from_web(PRODUCT_PATH)
+        # Read the current catalog snapshot
+        products = self.bot.catalog.products
         if product_name not in products:
             await inter.response.send_message(
                 "This product is no longer available.", 
@@ -41,6 +292,15 @@ class TransactionCommands(commands.Cog):
         price = product_data.get("price", 0)
         formatted_price = f"{price:,} VND"
         
+        # Stop the sale before payment if the file to deliver is missing
+        product_file_path = product_data.get("filename")
+        if product_file_path and self.bot.manifest.scans and not self.bot.manifest.get(product_file_path):
+            await inter.response.send_message(
+                "This product is temporarily unavailable. Please contact staff.",
+                ephemeral=True
+            )
+            return
+        
         # Confirm interaction
         await inter.response.send_message(
             f"Processing your order for **{product_name}**...", 
@@ -49,144 +309,130 @@ class TransactionCommands(commands.Cog):
         
         # If the product is free (price = 0), process it immediately without creating a ticket
         if price == 0:
-            # Load user data
-            users = load_json(USERS_PATH)
             user_id = str(inter.author.id)
             
             # Generate license key
             license_key = generate_license_key(user_id, product_name)
             
             # Update user data in database
-            if user_id not in users:
-                users[user_id] = {
-                    "total-payment": 0,
-                    "ownership": {}
-                }
-            
-            users[user_id]["ownership"][product_name] = license_key
+            await asyncio.to_thread(self.users.grant, user_id, product_name, license_key)
             
-            # Save updated user data
-            save_json(USERS_PATH, users)
-            
-            # Send product file to user via DM
-            try:
-                product_file_path = product_data.get("filename")
-                if not product_file_path:
-                    await inter.edit_original_message(
-                        content="Error: Product file path is not defined in the database."
-                    )
-                    return
-                
-                # Create DM channel with user
-                dm_channel = await inter.author.create_dm()
-                
-                # Create license info message
-                license_embed = disnake.Embed(
-                    title=f"Purchased Product: {product_name}",
-                    description="Thank you for your download! Here is your license information:",
-                    color=disnake.Color.green()
-                )
-                license_embed.add_field(name="License Key", value=f"`{license_key}`")
-                license_embed.add_field(name="Product", value=product_name)
-                license_embed.set_footer(text="Keep this license key safe as it confirms your ownership.")
-                
-                # Send license info and product file
-                await dm_channel.send(embed=license_embed)
-                
-                # Check if the file exists and send it
-                full_product_path = f"database/products/{product_file_path}"
-                if os.path.exists(full_product_path):
-                    await dm_channel.send(file=disnake.File(full_product_path))
-                    await inter.edit_original_message(
-                        content=f"✅ Your free product **{product_name}** has been delivered to your DMs!"
-                    )
-                else:
-                    await inter.edit_original_message(
-                        content=f"Warning: Product file not found. Please contact staff for assistance."
-                    )
-                
-            except Exception as e:
+            product_file_path = product_data.get("filename")
+            if not product_file_path:
                 await inter.edit_original_message(
-                    content=f"❌ Error delivering product: {str(e)}"
+                    content="Error: Product file path is not defined in the database."
                 )
+                return
             
+            # The DM is sent by the delivery worker, which retries if Discord fails
+            await self.enqueue_delivery(inter.author.id, product_name, license_key, product_file_path, free=True)
+            await inter.edit_original_message(
+                content=f"✅ Your free product **{product_name}** is being delivered to your DMs!"
+            )
+            
+            return
+        
+        # A user who already has an open order for this product is sent back to it
+        existing_channel = self.open_order_channel(inter.guild, inter.author.id, product_name)
+        if existing_channel:
+            await inter.edit_original_message(
+                content=f"You already have an open order for **{product_name}**: {existing_channel.mention}"
+            )
             return
         
+        # Duplicate clicks while the channel is being created share it and use no token
+        order_key = (inter.author.id, product_name)
+        if order_key not in self.guard.in_flight:
+            allowed, retry_after = self.guard.allow(inter.author.id)
+            if not allowed:
+                await inter.edit_original_message(
+                    content=f"You are creating orders too quickly. Please try again in {int(retry_after) + 1} seconds."
+                )
+                return
+        
         # Create private channel for this transaction
         try:
+            transaction_channel, created = await self.guard.run_once(
+                order_key, lambda: self.create_order_channel(inter, product_name, price, formatted_price)
+            )
+            
+            # Notify the user
+            if created:
+                await inter.edit_original_message(
+                    content=f"Your order has been created! Please go to {transaction_channel.mention} to complete your purchase."
+                )
+            else:
+                await inter.edit_original_message(
+                    content=f"You already have an open order for **{product_name}**: {transaction_channel.mention}"
+                )
+            
+        except Exception as e:
+            await inter.edit_original_message(
+                content=f"❌ Error creating transaction channel: {str(e)}"
+            )
+
+    async def create_order_channel(self, inter, product_name, price, formatted_price):
+        guild = inter.guild
+        
+        # Create private channel
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        channel_name = f"order-{inter.author.id}-{timestamp}"
+        
+        overwrites = {
+            guild.default_role: disnake.PermissionOverwrite(read_messages=False),
+            inter.author: disnake.PermissionOverwrite(read_messages=True, send_messages=True),
+            guild.me: disnake.PermissionOverwrite(read_messages=True, send_messages=True),
+        }
+        
+        # Grant access for staff role
+        staff_role = self.bot.resolver.role(guild, "Staff")
+        if staff_role:
+            overwrites[staff_role] = disnake.PermissionOverwrite(read_messages=True, send_messages=True)
+        
+        # Take a pre-created channel from the pool; create one only if it is empty
+        topic = f"Transaction for {product_name} by {inter.author.name}"
+        transaction_channel = await self.pool.acquire(guild, channel_name, overwrites, topic)
+        if transaction_channel is None:
             # Find or create transaction category
-            guild = inter.guild
-            transaction_category = None
-            for category in guild.categories:
-                if category.name == "Transactions":
-                    transaction_category = category
-                    break
-                    
+            transaction_category = self.bot.resolver.category(guild, "Transactions")
             if not transaction_category:
                 transaction_category = await guild.create_category(
                     name="Transactions",
                     reason="Created to handle product transactions"
                 )
             
-            # Create private channel
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            channel_name = f"order-{inter.author.id}-{timestamp}"
-            
-            overwrites = {
-                guild.default_role: disnake.PermissionOverwrite(read_messages=False),
-                inter.author: disnake.PermissionOverwrite(read_messages=True, send_messages=True),
-                guild.me: disnake.PermissionOverwrite(read_messages=True, send_messages=True),
-            }
-            
-            # Grant access for staff role
-            staff_role = None
-            for role in guild.roles:
-                if role.name == "Staff":
-                    staff_role = role
-                    break
-                    
-            if staff_role:
-                overwrites[staff_role] = disnake.PermissionOverwrite(read_messages=True, send_messages=True)
-            
             # Create transaction channel
             transaction_channel = await guild.create_text_channel(
                 name=channel_name,
                 category=transaction_category,
                 overwrites=overwrites,
-                topic=f"Transaction for {product_name} by {inter.author.name}"
-            )
-            
-            # Create cancel button
-            cancel_button = disnake.ui.Button(
-                style=disnake.ButtonStyle.danger,
-                label="Cancel Order",
-                custom_id="cancel_order"
-            )
-            
-            # Send initial message in transaction channel
-            transaction_embed = disnake.Embed(
-                title=f"Order: {product_name}",
-                description=f"Thank you for your purchase request, {inter.author.mention}!",
-                color=disnake.Color.teal()
-            )
-            transaction_embed.add_field(name="Price", value=formatted_price)
-            transaction_embed.add_field(name="Status", value="⏳ Waiting for staff")
-            transaction_embed.set_footer(text="A staff member will assist you shortly.")
-            
-            await transaction_channel.send(
-                embed=transaction_embed,
-                components=disnake.ui.ActionRow(cancel_button)
-            )
-            
-            # Notify the user
-            await inter.edit_original_message(
-                content=f"Your order has been created! Please go to {transaction_channel.mention} to complete your purchase."
-            )
-            
-        except Exception as e:
-            await inter.edit_original_message(
-                content=f"❌ Error creating transaction channel: {str(e)}"
+                topic=topic
             )
+        await asyncio.to_thread(self.orders.create, transaction_channel.id, inter.author.id, product_name, price)
+        
+        # Create cancel button
+        cancel_button = disnake.ui.Button(
+            style=disnake.ButtonStyle.danger,
+            label="Cancel Order",
+            custom_id="cancel_order"
+        )
+        
+        # Send initial message in transaction channel
+        transaction_embed = disnake.Embed(
+            title=f"Order: {product_name}",
+            description=f"Thank you for your purchase request, {inter.author.mention}!",
+            color=disnake.Color.teal()
+        )
+        transaction_embed.add_field(name="Price", value=formatted_price)
+        transaction_embed.add_field(name="Status", value="⏳ Waiting for staff")
+        transaction_embed.set_footer(text="A staff member will assist you shortly.")
+        
+        await transaction_channel.send(
+            embed=transaction_embed,
+            components=disnake.ui.ActionRow(cancel_button)
+        )
+        
+        return transaction_channel
 
     # Handle cancel order button
     @commands.Cog.listener("on_button_click")
@@ -195,24 +441,17 @@ class TransactionCommands(commands.Cog):
             return
         
         # Check if this is a transaction channel
-        if not inter.channel.name.startswith("order-"):
+        buyer_id = self.order_buyer_id(inter.channel)
+        if buyer_id is None:
             await inter.response.send_message("This command can only be used in transaction channels.", ephemeral=True)
             return
         
         # Check if user is the order creator
-        parts = inter.channel.name.split("-")
-        if len(parts) < 2:
-            await inter.response.send_message("Could not determine user ID from channel name.", ephemeral=True)
+        if buyer_id != inter.author.id:
+            await inter.response.send_message("Only the order creator can cancel the order.", ephemeral=True)
             return
         
-        try:
-            user_id = int(parts[1])
-            if user_id != inter.author.id:
-                await inter.response.send_message("Only the order creator can cancel the order.", ephemeral=True)
-                return
-        except:
-            await inter.response.send_message("Could not determine user ID from channel name.", ephemeral=True)
-            return
+        cog = self
         
         # Create confirmation view for cancellation
         class CancelConfirmView(disnake.ui.View):
@@ -234,6 +473,7 @@ class TransactionCommands(commands.Cog):
                 cancel_embed.set_footer(text=f"Cancelled by user on {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
                 
                 await button_inter.response.edit_message(content=None, embed=cancel_embed, view=None)
+                await cog.update_order(button_inter.channel, status="cancelled")
                 
                 # Send notification to notification channel
                 try:
@@ -249,11 +489,14 @@ class TransactionCommands(commands.Cog):
                 except Exception as e:
                     print(f"Error sending cancellation notification: {str(e)}")
                 
-                # Archive the channel
-                await asyncio.sleep(3)  # Wait 3 seconds for user to read notification
+                # Mark the channel once the user has had time to read the notification
                 try:
-                    await button_inter.channel.edit(name=f"cancelled-{button_inter.channel.name}")
-                    await button_inter.followup.send("Channel has been marked as cancelled.", ephemeral=True)
+                    await cog.bot.jobs.enqueue(
+                        "rename_channel",
+                        {"channel_id": button_inter.channel.id, "name": f"cancelled-{button_inter.channel.name}"},
+                        CANCEL_RENAME_DELAY
+                    )
+                    await button_inter.followup.send("Channel will be marked as cancelled.", ephemeral=True)
                 except Exception as e:
                     await button_inter.followup.send(f"Error marking channel: {str(e)}", ephemeral=True)
             
@@ -291,18 +534,18 @@ class TransactionCommands(commands.Cog):
     )
     async def transaction_sold(self, inter: disnake.ApplicationCommandInteraction):
         # Check if this is a transaction channel
-        if not inter.channel.name.startswith("order-"):
+        if self.order_buyer_id(inter.channel) is None:
             await inter.response.send_message("This command can only be used in transaction channels.", ephemeral=True)
             return
         
         # Check if user has Staff role
-        staff_role = get_item_by_attribute(inter.guild.roles, name="Staff")
+        staff_role = self.bot.resolver.role(inter.guild, "Staff")
         if staff_role not in inter.author.roles:
             await inter.response.send_message("Only staff can complete transactions.", ephemeral=True)
             return
         
-        # Load products
-        products = load_json_from_web(PRODUCT_PATH)
+        # Read the current catalog snapshot
+        products = self.bot.catalog.products
         if not products:
             await inter.response.send_message("Could not load product data.", ephemeral=True)
             return
@@ -349,12 +592,12 @@ class TransactionCommands(commands.Cog):
     )
     async def transaction_archive(self, inter: disnake.ApplicationCommandInteraction):
         # Check if this is a transaction channel
-        if not inter.channel.name.startswith("order-"):
+        if self.order_buyer_id(inter.channel) is None:
             await inter.response.send_message("This command can only be used in transaction channels.", ephemeral=True)
             return
         
         # Check if user has Staff role
-        staff_role = get_item_by_attribute(inter.guild.roles, name="Staff")
+        staff_role = self.bot.resolver.role(inter.guild, "Staff")
         if staff_role not in inter.author.roles:
             await inter.response.send_message("Only staff can archive transaction channels.", ephemeral=True)
             return
@@ -374,10 +617,83 @@ class TransactionCommands(commands.Cog):
             
             # Archive channel
             await inter.channel.edit(name=f"✓-{inter.channel.name}")
+            await self.update_order(inter.channel, status="archived")
             await inter.followup.send("Channel has been successfully archived.", ephemeral=True)
         except Exception as e:
             await inter.followup.send(f"Error when archiving channel: {str(e)}", ephemeral=True)
 
+    @transaction.sub_command(
+        name="jobs",
+        description="Show pending and failed delayed jobs"
+    )
+    async def transaction_jobs(self, inter: disnake.ApplicationCommandInteraction):
+        # Check if user has Staff role
+        staff_role = self.bot.resolver.role(inter.guild, "Staff")
+        if staff_role not in inter.author.roles:
+            await inter.response.send_message("Only staff can view delayed jobs.", ephemeral=True)
+            return
+        
+        jobs = self.bot.jobs
+        counts, pending, failed = await asyncio.to_thread(
+            lambda: (jobs.counts(), jobs.jobs("pending"), jobs.jobs("failed"))
+        )
+        
+        embed = disnake.Embed(
+            title="Delayed Jobs",
+            description=f"Pending: {counts.get('pending', 0)} | Running: {counts.get('running', 0)} | Failed: {counts.get('failed', 0)}",
+            color=disnake.Color.blue()
+        )
+        embed.add_field(
+            name="Next Pending",
+            value="\n".join(
+                f"#{job['job_id']} `{job['kind']}` {describe_job(job)} <t:{int(job['run_at'])}:R>"
+                for job in pending
+            ) or "None",
+            inline=False
+        )
+        embed.add_field(
+            name="Failed",
+            value="\n".join(
+                f"#{job['job_id']} `{job['kind']}` {describe_job(job)}: {job['last_error'][:80]}"
+                for job in failed
+            ) or "None",
+            inline=False
+        )
+        
+        await inter.response.send_message(embed=embed, ephemeral=True)
+
+    @transaction.sub_command(
+        name="retry",
+        description="Retry failed deliveries and jobs"
+    )
+    async def transaction_retry(
+        self,
+        inter: disnake.ApplicationCommandInteraction,
+        job_id: str = commands.Param(default="", description="Failed job to retry; leave blank to retry all failed deliveries")
+    ):
+        # Check if user has Staff role
+        staff_role = self.bot.resolver.role(inter.guild, "Staff")
+        if staff_role not in inter.author.roles:
+            await inter.response.send_message("Only staff can retry jobs.", ephemeral=True)
+            return
+        
+        if job_id:
+            try:
+                job_ids = await self.bot.jobs.retry(job_id=int(job_id.lstrip("#")))
+            except ValueError:
+                await inter.response.send_message("Invalid job ID format.", ephemeral=True)
+                return
+        else:
+            job_ids = await self.bot.jobs.retry(kind="deliver_product")
+        
+        if not job_ids:
+            await inter.response.send_message("No failed jobs to retry.", ephemeral=True)
+            return
+        await inter.response.send_message(
+            f"Retrying {len(job_ids)} job{'s' if len(job_ids) > 1 else ''}: {', '.join(f'#{requeued}' for requeued in job_ids[:20])}",
+            ephemeral=True
+        )
+
     # Handle product selection dropdown
     @commands.Cog.listener("on_dropdown")
     async def handle_product_select(self, inter: disnake.MessageInteraction):
@@ -387,14 +703,17 @@ class TransactionCommands(commands.Cog):
         # Get selected product
         selected_product = inter.values[0]
         
-        # Load product data
-        products = load_json_from_web(PRODUCT_PATH)
+        # Read the current catalog snapshot
+        catalog = self.bot.catalog
+        products = catalog.products
         if selected_product not in products:
             await inter.response.send_message("The selected product no longer exists in the database.", ephemeral=True)
             return
         
         product_data = products[selected_product]
         expected_price = product_data.get("price", 0)
+        user_store = self.users
+        cog = self
         
         # Create confirmation view
         class ConfirmationView(disnake.ui.View):
@@ -445,22 +764,18 @@ class TransactionCommands(commands.Cog):
                 await inter.response.edit_message(embed=product_embed, view=new_view)
                 
             async def handle_confirmation(self, inter: disnake.MessageInteraction, product: str):
-                # Extract user ID from channel name
-                parts = inter.channel.name.split("-")
-                if len(parts) < 2:
-                    await inter.response.send_message("Could not determine user ID from channel name.", ephemeral=True)
-                    return
-                
-                try:
-                    user_id = parts[1]
-                    user = await self.bot.fetch_user(int(user_id))
-                except:
+                # The buyer comes from the order record; they may have left the guild since
+                buyer_id = cog.order_buyer_id(inter.channel)
+                if buyer_id is None:
                     await inter.response.send_message("Could not find user for this transaction.", ephemeral=True)
                     return
+                user_id = str(buyer_id)
                 
-                # Load product and user data
-                products = load_json_from_web(PRODUCT_PATH)
-                users = load_json(USERS_PATH)
+                # Read the current catalog snapshot
+                products = catalog.products
+                if product not in products:
+                    await inter.response.send_message("The selected product no longer exists in the database.", ephemeral=True)
+                    return
                 
                 product_data = products[product]
                 expected_price = product_data.get("price", 0)
@@ -473,16 +788,8 @@ class TransactionCommands(commands.Cog):
                     license_key = generate_license_key(user_id, product)
                     
                     # Update user data in database
-                    if user_id not in users:
-                        users[user_id] = {
-                            "total-payment": 0,
-                            "ownership": {}
-                        }
-                    
-                    users[user_id]["ownership"][product] = license_key
-                    
-                    # Save updated user data
-                    save_json(USERS_PATH, users)
+                    await asyncio.to_thread(user_store.grant, user_id, product, license_key)
+                    await cog.update_order(inter.channel, status="completed", product=product, price=0)
                     
                     # Send product file to user via DM
                     try:
@@ -490,33 +797,13 @@ class TransactionCommands(commands.Cog):
                         if not product_file_path:
                             await inter.followup.send("Error: Product file path is not defined in the database.", ephemeral=True)
                         else:
-                            # Create DM channel with user
-                            dm_channel = await user.create_dm()
-                            
-                            # Create license info message
-                            license_embed = disnake.Embed(
-                                title=f"Purchased Product: {product}",
-                                description="Thank you for your download! Here is your license information:",
-                                color=disnake.Color.green()
-                            )
-                            license_embed.add_field(name="License Key", value=f"`{license_key}`")
-                            license_embed.add_field(name="Product", value=product)
-                            license_embed.set_footer(text="Keep this license key safe as it confirms your ownership.")
-                            
-                            # Send license info and product file
-                            await dm_channel.send(embed=license_embed)
-                            
-                            # Check if the file exists and send it
-                            full_product_path = f"database/products/{product_file_path}"
-                            if os.path.exists(full_product_path):
-                                await dm_channel.send(file=disnake.File(full_product_path))
-                            else:
-                                await inter.followup.send(f"Warning: Product file not found at path: {full_product_path}", ephemeral=True)
+                            # Queue the DM; the delivery worker retries it if Discord fails
+                            await cog.enqueue_delivery(buyer_id, product, license_key, product_file_path, free=True)
                             
                             # Send confirmation in the transaction channel
                             completion_embed = disnake.Embed(
                                 title="Transaction Complete",
-                                description=f"✅ Product **{product}** has been delivered to {user.mention}",
+                                description=f"✅ Product **{product}** is being delivered to <@{buyer_id}>",
                                 color=disnake.Color.green()
                             )
                             completion_embed.add_field(name="License Key", value=f"`{license_key}`")
@@ -527,14 +814,7 @@ class TransactionCommands(commands.Cog):
                             
                             # Close channel after a delay
                             await inter.channel.send("This transaction channel will be archived in 5 minutes.")
-                            await asyncio.sleep(300)  # Wait 5 minutes
-                            
-                            # Archive channel
-                            try:
-                                await inter.channel.edit(name=f"✓-{inter.channel.name}")
-                            except:
-                                # If archiving fails, try deleting
-                                await inter.channel.delete(reason="Transaction completed")
+                            await self.bot.jobs.enqueue("archive_channel", {"channel_id": inter.channel.id}, ORDER_ARCHIVE_DELAY)
                             
                     except Exception as e:
                         await inter.followup.send(f"Error completing transaction: {str(e)}", ephemeral=True)
@@ -585,17 +865,8 @@ class TransactionCommands(commands.Cog):
                             license_key = generate_license_key(user_id, product)
                             
                             # Update user data in database
-                            if user_id not in users:
-                                users[user_id] = {
-                                    "total-payment": 0,
-                                    "ownership": {}
-                                }
-                            
-                            users[user_id]["total-payment"] += payment_amount
-                            users[user_id]["ownership"][product] = license_key
-                            
-                            # Save updated user data
-                            save_json(USERS_PATH, users)
+                            await asyncio.to_thread(user_store.grant, user_id, product, license_key, payment_amount)
+                            await cog.update_order(modal_inter.channel, status="completed", product=product, price=payment_amount)
                             
                             # Send product file to user via DM
                             try:
@@ -603,33 +874,13 @@ class TransactionCommands(commands.Cog):
                                 if not product_file_path:
                                     await modal_inter.followup.send("Error: Product file path is not defined in the database.", ephemeral=True)
                                 else:
-                                    # Create DM channel with user
-                                    dm_channel = await user.create_dm()
-                                    
-                                    # Create license info message
-                                    license_embed = disnake.Embed(
-                                        title=f"Purchased Product: {product}",
-                                        description="Thank you for your purchase! Here is your license information:",
-                                        color=disnake.Color.green()
-                                    )
-                                    license_embed.add_field(name="License Key", value=f"`{license_key}`")
-                                    license_embed.add_field(name="Product", value=product)
-                                    license_embed.set_footer(text="Keep this license key safe as it confirms your purchase.")
-                                    
-                                    # Send license info and product file
-                                    await dm_channel.send(embed=license_embed)
-                                    
-                                    # Check if the file exists and send it
-                                    full_product_path = f"database/products/{product_file_path}"
-                                    if os.path.exists(full_product_path):
-                                        await dm_channel.send(file=disnake.File(full_product_path))
-                                    else:
-                                        await modal_inter.followup.send(f"Warning: Product file not found at path: {full_product_path}", ephemeral=True)
+                                    # Queue the DM; the delivery worker retries it if Discord fails
+                                    await cog.enqueue_delivery(buyer_id, product, license_key, product_file_path, free=False)
                                     
                                     # Send confirmation in the transaction channel
                                     completion_embed = disnake.Embed(
                                         title="Transaction Complete",
-                                        description=f"✅ Product **{product}** has been delivered to {user.mention}",
+                                        description=f"✅ Product **{product}** is being delivered to <@{buyer_id}>",
                                         color=disnake.Color.green()
                                     )
                                     completion_embed.add_field(name="License Key", value=f"`{license_key}`")
@@ -640,14 +891,7 @@ class TransactionCommands(commands.Cog):
                                     
                                     # Close channel after a delay
                                     await modal_inter.channel.send("This transaction channel will be archived in 5 minutes.")
-                                    await asyncio.sleep(300)  # Wait 5 minutes
-                                    
-                                    # Archive channel (or delete it based on your preference)
-                                    try:
-                                        await modal_inter.channel.edit(name=f"✓-{modal_inter.channel.name}")
-                                    except:
-                                        # If archiving fails, try deleting
-                                        await modal_inter.channel.delete(reason="Transaction completed")
+                                    await cog.bot.jobs.enqueue("archive_channel", {"channel_id": modal_inter.channel.id}, ORDER_ARCHIVE_DELAY)
                                     
                             except Exception as e:
                                 await modal_inter.followup.send(f"Error completing transaction: {str(e)}", ephemeral=True)
@@ -661,9 +905,14 @@ class TransactionCommands(commands.Cog):
             description=f"Please confirm the transaction for:\n\n**Product:** {selected_product}\n**Price:** {expected_price:,} VND",
             color=disnake.Color.gold()
         )
+        selected_file = product_data.get("filename")
+        if selected_file and self.bot.manifest.scans and not self.bot.manifest.get(selected_file):
+            confirmation_embed.add_field(
+                name="⚠️ Warning",
+                value=f"The product file `{selected_file}` is missing, so delivery will fail until it is restored."
+            )
         
-        view = ConfirmationView()
-        view.bot = self.bot
+        view = ConfirmationView(self.bot)
         await inter.response.edit_message(embed=confirmation_embed, view=view)
         view.message = await inter.original_message()
 
@@ -0,0 +1,90 @@
+# common.py
+# Shared constants and helpers. Importing this module must not do any I/O,
+# so cogs can import it without re-running main.py.
+import json
+import os
+
+from services.persistence import atomic_write
+
+# Constants for file paths
+USERS_PATH = "database/users.json"
+USERS_DB_PATH = "database/users.db"
+USER_STORE_BACKEND = "sqlite"  # "sqlite" or "json"
+ORDERS_DB_PATH = "database/orders.db"
+JOBS_DB_PATH = "database/jobs.db"
+RELEASES_DB_PATH = "database/releases.db"
+STARTUP_TIMINGS_PATH = "database/startup_timings.jsonl"
+
+# How long write-behind JSON files wait to coalesce changes before writing
+PERSIST_FLUSH_INTERVAL = 2.0  # seconds
+
+# Release notices DM every owner of a product; kept well under Discord's global limit
+RELEASE_SENDS_PER_SECOND = 5
+
+# Remote catalog (product.json, category.json, defaultChannels.json)
+CATALOG_URL = "https://violet-betteanne-78.tiiny.site"
+CATALOG_SNAPSHOT_PATH = "database/catalog.json"
+CATALOG_REFRESH_INTERVAL = 300  # seconds
+
+# Private channel product files are uploaded to once and linked from deliveries.
+# None attaches the file to every delivery DM instead.
+PRODUCT_STORAGE_CHANNEL_ID = None
+ATTACHMENT_CACHE_PATH = "database/attachment_cache.json"
+
+# Size, mtime and SHA-256 of every file in database/products
+PRODUCTS_DIR = "database/products"
+PRODUCT_MANIFEST_PATH = "database/product_manifest.json"
+PRODUCT_MANIFEST_POLL_INTERVAL = 30  # seconds
+
+# Optional HTTP server delivering product files through signed, expiring links.
+# Needs the DOWNLOAD_SECRET environment variable.
+DOWNLOAD_SERVER_ENABLED = False
+DOWNLOAD_SERVER_HOST = "0.0.0.0"
+DOWNLOAD_SERVER_PORT = 8080
+DOWNLOAD_BASE_URL = "http://localhost:8080"  # address buyers reach the server at
+DOWNLOAD_SECRET = os.environ.get("DOWNLOAD_SECRET", "")
+DOWNLOAD_LINK_TTL = 86400  # seconds
+DOWNLOAD_MAX_PER_LINK = 3  # times the file size a link may serve in total, resumes included
+DOWNLOAD_COUNTS_PATH = "database/download_links.json"
+
+# Delayed jobs (channel archive/rename/delete) run at most this many at a time
+JOB_CONCURRENCY = 4
+
+# Role IDs
+ADMIN_ROLE_ID = 1266005007363215472
+DEFAULT_ROLE_ID = 1365888967358287882
+MEMBERSHIP_ROLES = {
+    "Platinum": 1365889467780431993,
+    "Amethyst": 1365889418942222437,
+    "Diamond": 1365889372880375868,
+    "Gold": 1365889268500795442,
+    "Iron": 1365889018704953354
+}
+
+# Giveaway draw weight per membership tier; members without a tier count as 1
+MEMBERSHIP_DRAW_WEIGHTS = {
+    "Platinum": 5,
+    "Amethyst": 4,
+    "Diamond": 3,
+    "Gold": 2,
+    "Iron": 1.5
+}
+
+# Utility functions
+def load_json(file_path):
+    """Load JSON data from a file"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
+        return {}
+
+def save_json(file_path, data):
+    """Save JSON data to a file"""
+    try:
+        atomic_write(file_path, json.dumps(data, indent=4))
+        return True
+    except Exception as e:
+        print(f"Error saving to {file_path}: {e}")
+        return False
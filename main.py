@@ -1,86 +1,60 @@
 # main.py
+import time
+STARTUP_STARTED = time.perf_counter()
+
 import disnake
 from disnake.ext import commands
-import json
 import os
-import asyncio
-import sys
-import requests
 from env import *
 
-# Add the dev directory to the path for importing license key generator
-sys.path.append('dev')
-from lisenceKey import generate_license_key
-
-# Constants for file paths
-# CATEGORY_PATH = "database/category.json"
-# PRODUCT_PATH = "database/product.json"
-USERS_PATH = "database/users.json"
-# DEFAULT_CHANNELS_PATH = "database/defaultChannels.json"
-PRODUCT_PATH = requests.get("https://violet-betteanne-78.tiiny.site/product.json").text
-DEFAULT_CHANNELS_PATH = requests.get("https://violet-betteanne-78.tiiny.site/defaultChannels.json").text
-CATEGORY_PATH = requests.get("https://violet-betteanne-78.tiiny.site/category.json").text
-
-# Role IDs
-ADMIN_ROLE_ID = 1266005007363215472
-DEFAULT_ROLE_ID = 1365888967358287882
-MEMBERSHIP_ROLES = {
-    "Platinum": 1365889467780431993,
-    "Amethyst": 1365889418942222437,
-    "Diamond": 1365889372880375868,
-    "Gold": 1365889268500795442,
-    "Iron": 1365889018704953354
-}
-
-# Utility functions
-def load_json(file_path):
-    """Load JSON data from a file"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
-    except Exception as e:
-        print(f"Error loading {file_path}: {e}")
-        return {}
-
-def load_json_from_web(file_path):
-    """Load JSON data from a file"""
-    try:
-        return json.loads(file_path)
-    except Exception as e:
-        print(f"Error loading {file_path}: {e}")
-        return {}
-
-def save_json(file_path, data):
-    """Save JSON data to a file"""
-    try:
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=4)
-        return True
-    except Exception as e:
-        print(f"Error saving to {file_path}: {e}")
-        return False
+# Shared constants and helpers live in common.py so cogs never import main
+from common import DEFAULT_ROLE_ID, CATALOG_URL, CATALOG_SNAPSHOT_PATH, CATALOG_REFRESH_INTERVAL, STARTUP_TIMINGS_PATH
+from common import JOBS_DB_PATH, JOB_CONCURRENCY, PERSIST_FLUSH_INTERVAL
+from common import PRODUCTS_DIR, PRODUCT_MANIFEST_PATH, PRODUCT_MANIFEST_POLL_INTERVAL
+from services.catalog import Catalog
+from services.guild_resolver import GuildResolver
+from services.job_queue import JobQueue
+from services.product_manifest import ProductManifest
+from services.startup_timer import StartupTimer
+from services import persistence
 
-def get_item_by_attribute(iterable, **attributes):
-    """Find items in iterables by attribute values"""
-    for item in iterable:
-        matches = True
-        for attr_name, attr_value in attributes.items():
-            if getattr(item, attr_name, None) != attr_value:
-                matches = False
-                break
-        if matches:
-            return item
-    return None
+startup_timer = StartupTimer(STARTUP_STARTED)
+startup_timer.mark("imports")
 
 # Setup bot
 intents = disnake.Intents.default()
 intents.members = True  # Enable member intents to track joins
 bot = commands.InteractionBot(intents=intents)
 
+# Serve the last good catalog snapshot until the first refresh completes
+bot.catalog = Catalog(CATALOG_URL, CATALOG_SNAPSHOT_PATH, CATALOG_REFRESH_INTERVAL)
+bot.catalog.load_snapshot()
+
+# Cached name lookups for roles, categories and channels
+bot.resolver = GuildResolver()
+bot.resolver.attach(bot)
+
+# Persisted delayed jobs; cogs register their handlers while loading
+bot.jobs = JobQueue(JOBS_DB_PATH, JOB_CONCURRENCY)
+
+# Product files are checked against the catalog here, never at sale time
+bot.manifest = ProductManifest(PRODUCTS_DIR, PRODUCT_MANIFEST_PATH, PRODUCT_MANIFEST_POLL_INTERVAL, PERSIST_FLUSH_INTERVAL)
+bot.catalog.add_listener(lambda snapshot: bot.manifest.report(snapshot.products))
+startup_timer.mark("bot setup + catalog snapshot")
+
 # Event handlers
 @bot.event
 async def on_ready():
     print(f"Logged in as {bot.user}!")
+    if not startup_timer.reported:
+        startup_timer.mark("connect (time-to-ready)")
+        startup_timer.report(STARTUP_TIMINGS_PATH)
+
+    # Remote catalog data is only fetched once the gateway is up
+    bot.catalog.start()
+    # Delayed jobs resolve channels from the cache, so they also wait for ready
+    bot.jobs.start()
+    bot.manifest.start(bot.catalog)
     await bot.change_presence(activity=disnake.Activity(type=disnake.ActivityType.watching, name="Fuji Studio"))
 
 @bot.event
@@ -96,18 +70,25 @@ async def on_member_join(member):
 
 # Load all cogs
 def load_cogs():
-    for filename in os.listdir("cogs"):
+    for filename in sorted(os.listdir("cogs")):
         if filename.endswith(".py"):
             bot.load_extension(f"cogs.{filename[:-3]}")
+            startup_timer.mark(f"cog {filename[:-3]}")
             print(f"Loaded cog: {filename[:-3]}")
 
 if __name__ == "__main__":
     # Create cogs directory if it doesn't exist
     if not os.path.exists("cogs"):
         os.makedirs("cogs")
-    
+
     # Load all cogs
     load_cogs()
-    
+
     # Run the bot
-    bot.run(BOT_TOKEN)
\ No newline at end of file
+    try:
+        bot.run(BOT_TOKEN)
+    finally:
+        # Write out anything still waiting in the write-behind buffers
+        persistence.flush_all()
+        for store_stats in persistence.stats():
+            print(f"Persistence {store_stats['path']}: {store_stats['writes_performed']} writes, {store_stats['writes_avoided']} avoided")
@@ -0,0 +1,136 @@
+# services/attachment_cache.py
+import asyncio
+import datetime
+import os
+import time
+from urllib.parse import urlparse, parse_qs
+
+import disnake
+
+from common import load_json
+from services.persistence import DebouncedJSONFile
+from services.product_manifest import file_sha256
+
+# Signed CDN links live about 24 hours and end up in DMs buyers keep, so a
+# cached link is only handed out while at least this much of it remains
+URL_MIN_LIFETIME = 23 * 3600
+
+
+def url_expires_at(url):
+    """Unix time a signed Discord CDN link expires (its `ex` parameter), or None"""
+    try:
+        return int(parse_qs(urlparse(url).query)["ex"][0], 16)
+    except (KeyError, ValueError):
+        return None
+
+
+class AttachmentCache:
+    """Product files uploaded once to a private storage channel, keyed by SHA-256.
+
+    `url_for(path)` returns a download link for the file's current contents:
+    the cached signed link while it is valid, a fresh one from the stored
+    message otherwise, and a new upload only when no message holds those
+    contents yet. A changed file hashes differently, so it is uploaded again
+    and the entries for its old contents are dropped.
+    """
+
+    def __init__(self, bot, storage_channel_id, path, flush_interval=2.0):
+        self.bot = bot
+        self.storage_channel_id = storage_channel_id
+        self.entries = load_json(path) if os.path.exists(path) else {}
+        self.store = DebouncedJSONFile(path, lambda: self.entries, flush_interval)
+        # path -> (size, mtime_ns, sha256), so unchanged files are not re-hashed
+        self.digests = {}
+        self.upload_locks = {}
+        self.hits = 0
+        self.refreshes = 0
+        self.uploads = 0
+
+    @property
+    def enabled(self):
+        return bool(self.storage_channel_id)
+
+    async def digest(self, path):
+        stat = os.stat(path)
+        cached = self.digests.get(path)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        sha256 = await asyncio.to_thread(file_sha256, path)
+        self.digests[path] = (stat.st_size, stat.st_mtime_ns, sha256)
+        return sha256
+
+    def _forget_old_versions(self, filename, sha256):
+        stale = [key for key, entry in self.entries.items() if entry["filename"] == filename and key != sha256]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self.store.mark_dirty()
+
+    async def _refresh(self, channel, entry):
+        """A freshly signed link for a stored attachment, or None if the message is gone"""
+        try:
+            message = await channel.fetch_message(entry["message_id"])
+        except disnake.NotFound:
+            return None
+        for attachment in message.attachments:
+            if attachment.id == entry["attachment_id"]:
+                return attachment.url
+        return None
+
+    async def url_for(self, path, sha256=None):
+        """Download link for the file at path, uploading it if needed; None if disabled"""
+        if not self.enabled:
+            return None
+        channel = self.bot.get_channel(self.storage_channel_id)
+        if channel is None:
+            return None
+
+        sha256 = sha256 or await self.digest(path)
+        filename = os.path.basename(path)
+        lock = self.upload_locks.setdefault(sha256, asyncio.Lock())
+        async with lock:
+            entry = self.entries.get(sha256)
+            if entry:
+                expires_at = entry.get("expires_at")
+                if expires_at is None or expires_at - URL_MIN_LIFETIME > time.time():
+                    self.hits += 1
+                    return entry["url"]
+                url = await self._refresh(channel, entry)
+                if url:
+                    self.refreshes += 1
+                    entry["url"] = url
+                    entry["expires_at"] = url_expires_at(url)
+                    self.store.mark_dirty()
+                    return url
+                # The storage message was deleted; upload again
+                del self.entries[sha256]
+
+            message = await channel.send(
+                content=f"`{filename}` sha256 `{sha256}`",
+                file=disnake.File(path)
+            )
+            attachment = message.attachments[0]
+            self.uploads += 1
+            self._forget_old_versions(filename, sha256)
+            self.entries[sha256] = {
+                "filename": filename,
+                "size": attachment.size,
+                "message_id": message.id,
+                "attachment_id": attachment.id,
+                "url": attachment.url,
+                "expires_at": url_expires_at(attachment.url),
+                "uploaded_at": datetime.datetime.now().isoformat()
+            }
+            self.store.mark_dirty()
+            return attachment.url
+
+    def flush(self):
+        self.store.flush()
+
+    def stats(self):
+        return {
+            "cached": len(self.entries),
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "uploads": self.uploads
+        }
@@ -0,0 +1,178 @@
+# services/catalog.py
+import asyncio
+import json
+import os
+import time
+from types import MappingProxyType
+from typing import NamedTuple
+
+import aiohttp
+
+# Remote file backing each section of the catalog
+CATALOG_FILES = {
+    "products": "product.json",
+    "categories": "category.json",
+    "default_channels": "defaultChannels.json"
+}
+
+
+def freeze(value):
+    """Recursively turn parsed JSON into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class CatalogSnapshot(NamedTuple):
+    """Immutable, already-parsed view of the remote catalog"""
+    products: MappingProxyType
+    categories: MappingProxyType
+    default_channels: MappingProxyType
+    fetched_at: float
+
+    @classmethod
+    def from_raw(cls, raw, fetched_at):
+        return cls(
+            products=freeze(raw.get("products") or {}),
+            categories=freeze(raw.get("categories") or {}),
+            default_channels=freeze(raw.get("default_channels") or {}),
+            fetched_at=fetched_at
+        )
+
+
+class Catalog:
+    """Product catalog that is parsed once and refreshed in the background.
+
+    Handlers read `catalog.products` and friends, which is just an attribute
+    lookup on the current snapshot. A background task polls the remote host
+    with conditional requests and swaps in a new snapshot only when every
+    file was fetched successfully, so a slow or failing host leaves the last
+    good snapshot in place. Each good snapshot is also written to disk so a
+    cold start can serve the catalog before (or without) reaching the host.
+    """
+
+    def __init__(self, base_url, snapshot_path, refresh_interval=300, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.snapshot = CatalogSnapshot.from_raw({}, 0.0)
+        self.raw = {}
+        self.validators = {}
+        self.refresh_task = None
+        self.listeners = []
+
+    def add_listener(self, callback):
+        """Call `callback(snapshot)` after every refresh that changed the catalog"""
+        self.listeners.append(callback)
+
+    @property
+    def products(self):
+        return self.snapshot.products
+
+    @property
+    def categories(self):
+        return self.snapshot.categories
+
+    @property
+    def default_channels(self):
+        return self.snapshot.default_channels
+
+    def load_snapshot(self):
+        """Load the last good snapshot from disk, returns True if one was found"""
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Error loading catalog snapshot {self.snapshot_path}: {e}")
+            return False
+
+        self.raw = data.get("data", {})
+        self.validators = data.get("validators", {})
+        self.snapshot = CatalogSnapshot.from_raw(self.raw, data.get("fetched_at", 0.0))
+        return True
+
+    def save_snapshot(self, raw, validators, fetched_at):
+        """Atomically write a snapshot to disk"""
+        if os.path.dirname(self.snapshot_path):
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"fetched_at": fetched_at, "validators": validators, "data": raw}, file)
+        os.replace(temp_path, self.snapshot_path)
+
+    async def fetch_file(self, session, key, filename):
+        """Fetch one catalog file, returns (data, validators) or None if unchanged"""
+        headers = {}
+        validators = self.validators.get(key, {})
+        if key in self.raw:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        async with session.get(f"{self.base_url}/{filename}", headers=headers) as response:
+            if response.status == 304:
+                return None
+            response.raise_for_status()
+            data = json.loads(await response.text())
+            return data, {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
+
+    async def refresh(self):
+        """Fetch the catalog and swap in a new snapshot, returns True if it changed"""
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            results = await asyncio.gather(*(
+                self.fetch_file(session, key, filename)
+                for key, filename in CATALOG_FILES.items()
+            ))
+
+        changed = {key: result for key, result in zip(CATALOG_FILES, results) if result is not None}
+        if not changed:
+            return False
+
+        raw = dict(self.raw)
+        validators = dict(self.validators)
+        for key, (data, file_validators) in changed.items():
+            raw[key] = data
+            validators[key] = file_validators
+
+        fetched_at = time.time()
+        self.snapshot = CatalogSnapshot.from_raw(raw, fetched_at)
+        self.raw = raw
+        self.validators = validators
+
+        try:
+            await asyncio.to_thread(self.save_snapshot, raw, validators, fetched_at)
+        except Exception as e:
+            print(f"Error saving catalog snapshot: {e}")
+        return True
+
+    async def refresh_loop(self):
+        while True:
+            try:
+                if await self.refresh():
+                    print(f"Catalog refreshed: {len(self.products)} products")
+                    for callback in self.listeners:
+                        callback(self.snapshot)
+            except Exception as e:
+                # Keep serving the last good snapshot
+                print(f"Error refreshing catalog, serving snapshot from {time.ctime(self.snapshot.fetched_at)}: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """Start the background refresh task (safe to call more than once)"""
+        if self.refresh_task is None or self.refresh_task.done():
+            self.refresh_task = asyncio.get_running_loop().create_task(self.refresh_loop())
+
+    def stop(self):
+        if self.refresh_task is not None:
+            self.refresh_task.cancel()
+            self.refresh_task = None
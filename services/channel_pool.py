@@ -0,0 +1,130 @@
+# services/channel_pool.py
+import asyncio
+
+import disnake
+
+# Discord's hard limits
+CATEGORY_CHANNEL_LIMIT = 50
+GUILD_CHANNEL_LIMIT = 500
+
+
+class ChannelPool:
+    """Warm pool of hidden `pool-N` text channels in one category.
+
+    `acquire()` turns a pooled channel into an order channel with a single
+    edit (name, topic and overwrites), which is much cheaper than creating a
+    channel while the buyer waits. The pool is refilled in the background up
+    to `target_size`, and never grows a category or guild past Discord's
+    channel limits. Pooled channels are found again by name after a restart,
+    so no state is stored.
+    """
+
+    PREFIX = "pool-"
+
+    def __init__(self, bot, category_name, staff_role_name, target_size=5, headroom=5):
+        self.bot = bot
+        self.category_name = category_name
+        self.staff_role_name = staff_role_name
+        self.target_size = target_size
+        # Channel slots kept free for everything else in the guild / category
+        self.headroom = headroom
+        self.available = {}
+        self.next_number = {}
+        self.tasks = {}
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+
+    def _discover(self, guild):
+        category = self.bot.resolver.category(guild, self.category_name)
+        pooled = []
+        numbers = [0]
+        for channel in category.text_channels if category else ():
+            if channel.name.startswith(self.PREFIX) and channel.name[len(self.PREFIX):].isdigit():
+                pooled.append(channel.id)
+                numbers.append(int(channel.name[len(self.PREFIX):]))
+        self.available[guild.id] = pooled
+        self.next_number[guild.id] = max(numbers) + 1
+
+    def _ensure_discovered(self, guild):
+        # Numbering must continue after the pool channels already in the guild
+        if guild.id not in self.available:
+            self._discover(guild)
+
+    def start(self):
+        """Pick up existing pool channels and top every guild's pool up"""
+        for guild in self.bot.guilds:
+            self.replenish(guild)
+
+    def replenish(self, guild):
+        """Refill the guild's pool in the background (one task per guild)"""
+        self._ensure_discovered(guild)
+        task = self.tasks.get(guild.id)
+        if task is None or task.done():
+            self.tasks[guild.id] = asyncio.create_task(self._replenish(guild))
+
+    def _has_room(self, guild, category):
+        return (
+            len(guild.channels) < GUILD_CHANNEL_LIMIT - self.headroom
+            and (category is None or len(category.channels) < CATEGORY_CHANNEL_LIMIT - self.headroom)
+        )
+
+    async def _replenish(self, guild):
+        try:
+            category = self.bot.resolver.category(guild, self.category_name)
+            while len(self.available.get(guild.id, ())) < self.target_size and self._has_room(guild, category):
+                if category is None:
+                    category = await guild.create_category(
+                        name=self.category_name,
+                        reason="Created to handle product transactions"
+                    )
+                overwrites = {
+                    guild.default_role: disnake.PermissionOverwrite(read_messages=False),
+                    guild.me: disnake.PermissionOverwrite(read_messages=True, send_messages=True),
+                }
+                staff_role = self.bot.resolver.role(guild, self.staff_role_name)
+                if staff_role:
+                    overwrites[staff_role] = disnake.PermissionOverwrite(read_messages=True, send_messages=True)
+
+                number = self.next_number.get(guild.id, 1)
+                self.next_number[guild.id] = number + 1
+                channel = await guild.create_text_channel(
+                    name=f"{self.PREFIX}{number}",
+                    category=category,
+                    overwrites=overwrites,
+                    reason="Pre-created order channel"
+                )
+                self.available.setdefault(guild.id, []).append(channel.id)
+                self.created += 1
+        except Exception as e:
+            print(f"Error replenishing order channel pool: {e}")
+
+    async def acquire(self, guild, name, overwrites, topic):
+        """Assign a pooled channel to an order, or return None if the pool is empty"""
+        self._ensure_discovered(guild)
+        pooled = self.available[guild.id]
+        while pooled:
+            channel = guild.get_channel(pooled.pop())
+            if channel is None:
+                # Deleted by hand while in the pool
+                continue
+            try:
+                await channel.edit(name=name, topic=topic, overwrites=overwrites)
+            except disnake.HTTPException as e:
+                print(f"Error assigning pooled channel {channel.id}: {e}")
+                continue
+            self.hits += 1
+            self.replenish(guild)
+            return channel
+
+        self.misses += 1
+        self.replenish(guild)
+        return None
+
+    def stats(self):
+        return {
+            "available": sum(len(pooled) for pooled in self.available.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created
+        }
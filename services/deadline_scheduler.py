@@ -0,0 +1,75 @@
+# services/deadline_scheduler.py
+import asyncio
+import heapq
+import itertools
+import time
+
+# Upper bound on a single sleep so wall-clock jumps are noticed
+MAX_SLEEP = 3600
+
+
+class DeadlineScheduler:
+    """Min-heap of (deadline, key) that sleeps until exactly the next deadline.
+
+    `schedule()` and `cancel()` are O(log n) / O(1): cancelled or rescheduled
+    entries stay in the heap and are skipped when they reach the top. Due keys
+    are handed to `callback(key)` concurrently, at most `max_concurrency` at
+    a time. Deadlines are Unix timestamps.
+    """
+
+    def __init__(self, callback, max_concurrency=4):
+        self.callback = callback
+        self.heap = []
+        self.deadlines = {}
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.running = set()
+
+    def schedule(self, key, deadline):
+        """Add key, or move it to a new deadline"""
+        self.deadlines[key] = deadline
+        heapq.heappush(self.heap, (deadline, next(self.counter), key))
+        if self.heap[0][2] == key:
+            # New earliest deadline: wake the runner so it sleeps less
+            self.wakeup.set()
+
+    def cancel(self, key):
+        """Forget key; returns True if it was scheduled"""
+        return self.deadlines.pop(key, None) is not None
+
+    def next_deadline(self):
+        # Drop heap entries that were cancelled or rescheduled
+        while self.heap and self.deadlines.get(self.heap[0][2]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    async def run(self):
+        """Run forever, firing keys as their deadlines pass"""
+        while True:
+            self.wakeup.clear()
+            deadline = self.next_deadline()
+            delay = None if deadline is None else deadline - time.time()
+
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), min(delay, MAX_SLEEP) if delay else None)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, key = heapq.heappop(self.heap)
+            del self.deadlines[key]
+            task = asyncio.create_task(self._fire(key))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _fire(self, key):
+        async with self.semaphore:
+            try:
+                await self.callback(key)
+            except Exception as e:
+                print(f"Error running scheduled job {key}: {e}")
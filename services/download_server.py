@@ -0,0 +1,197 @@
+# services/download_server.py
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+
+from aiohttp import web
+
+from common import load_json
+from services.persistence import DebouncedJSONFile
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def sign(secret, claims, license_key):
+    """HMAC-SHA256 over the claims and the buyer's license key.
+
+    The license key is not part of the link, but a link only verifies while
+    the buyer still holds that key for the product.
+    """
+    message = json.dumps(claims, sort_keys=True, separators=(",", ":")).encode() + b"\0" + license_key.encode()
+    return hmac.new(secret, message, hashlib.sha256).digest()
+
+
+def make_token(secret, user_id, product, license_key, filename, ttl):
+    claims = {
+        "u": int(user_id),
+        "p": product,
+        "f": filename,
+        "e": int(time.time() + ttl),
+        # Identifies the link for its download count
+        "n": secrets.token_urlsafe(9)
+    }
+    payload = json.dumps(claims, separators=(",", ":")).encode()
+    return f"{_b64encode(payload)}.{_b64encode(sign(secret, claims, license_key))}"
+
+
+def read_token(token):
+    """Claims of a token and its signature, without verifying them; raises ValueError"""
+    try:
+        payload, signature = token.split(".", 1)
+        return json.loads(_b64decode(payload)), _b64decode(signature)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed download token") from e
+
+
+class CountedFileResponse(web.FileResponse):
+    """FileResponse that reports the body length it actually sent"""
+
+    def __init__(self, path, on_sent, **kwargs):
+        super().__init__(path, **kwargs)
+        self.on_sent = on_sent
+
+    async def prepare(self, request):
+        writer = await super().prepare(request)
+        # Not reached if the client disconnects mid-transfer
+        self.on_sent((self.content_length or 0) if 200 <= self.status < 300 else 0)
+        return writer
+
+
+class DownloadServer:
+    """Optional HTTP endpoint serving product files through expiring signed links.
+
+    Files are sent with `web.FileResponse`, which uses sendfile and answers
+    Range requests, so large builds never pass through Python or the
+    Discord upload limit. `license_lookup(user_id, product)` must return the
+    buyer's current license key for the product (or None); it is awaited for
+    every request. Each link may serve `max_downloads` times the file's size
+    in total, so interrupted downloads can resume with Range requests but
+    repeated partial requests cannot get around the limit.
+    """
+
+    def __init__(self, host, port, base_url, secret, products_dir, license_lookup,
+                 link_ttl=86400, max_downloads=3, counts_path=None, flush_interval=2.0):
+        self.host = host
+        self.port = port
+        self.base_url = base_url.rstrip("/")
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.products_dir = os.path.realpath(products_dir)
+        self.license_lookup = license_lookup
+        self.link_ttl = link_ttl
+        self.max_downloads = max_downloads
+        # nonce -> [bytes served or reserved, expires_at]
+        self.counts = load_json(counts_path) if counts_path and os.path.exists(counts_path) else {}
+        self.counts_store = DebouncedJSONFile(counts_path, lambda: self.counts, flush_interval) if counts_path else None
+        self.runner = None
+        self.downloads = 0
+        self.rejected = 0
+        self.bytes_served = 0
+
+        self.app = web.Application()
+        self.app.router.add_get("/download/{token}", self.handle_download)
+
+    def make_link(self, user_id, product, license_key, filename):
+        token = make_token(self.secret, user_id, product, license_key, filename, self.link_ttl)
+        return f"{self.base_url}/download/{token}"
+
+    def _resolve(self, filename):
+        path = os.path.realpath(os.path.join(self.products_dir, filename))
+        if os.path.dirname(path) != self.products_dir:
+            return None
+        return path
+
+    def _reject(self, status, reason):
+        self.rejected += 1
+        return web.Response(status=status, text=reason)
+
+    def _prune_counts(self):
+        now = time.time()
+        expired = [nonce for nonce, (_, expires_at) in self.counts.items() if expires_at < now]
+        for nonce in expired:
+            del self.counts[nonce]
+
+    async def handle_download(self, request):
+        try:
+            claims, signature = read_token(request.match_info["token"])
+            user_id, product, filename, nonce = claims["u"], claims["p"], claims["f"], claims["n"]
+        except (ValueError, KeyError, TypeError):
+            return self._reject(400, "Invalid download link.")
+
+        license_key = await self.license_lookup(user_id, product)
+        if not license_key or not hmac.compare_digest(sign(self.secret, claims, license_key), signature):
+            return self._reject(403, "This download link is not valid.")
+
+        try:
+            expires_at = int(claims["e"])
+        except (KeyError, TypeError, ValueError):
+            return self._reject(403, "This download link is not valid.")
+        if expires_at < time.time():
+            return self._reject(410, "This download link has expired.")
+
+        path = self._resolve(filename)
+        if path is None or not os.path.isfile(path):
+            return self._reject(404, "File not found.")
+
+        size = os.path.getsize(path)
+        try:
+            http_range = request.http_range
+            requested = len(range(size)[http_range])
+        except ValueError:
+            return self._reject(416, "Invalid range.")
+
+        # Reserve the requested bytes up front so concurrent requests cannot overrun the limit
+        served, _ = self.counts.get(nonce, (0, expires_at))
+        if served + requested > self.max_downloads * size:
+            return self._reject(429, "This download link has reached its download limit.")
+        self._prune_counts()
+        self.counts[nonce] = [served + requested, expires_at]
+        if self.counts_store:
+            self.counts_store.mark_dirty()
+        if not http_range.start:
+            self.downloads += 1
+
+        def on_sent(sent):
+            self.bytes_served += sent
+            # Give back what was reserved but not sent (e.g. a 304 or 416 answer)
+            if nonce in self.counts and sent != requested:
+                self.counts[nonce][0] += sent - requested
+                if self.counts_store:
+                    self.counts_store.mark_dirty()
+
+        return CountedFileResponse(path, on_sent, headers={
+            "Content-Disposition": f'attachment; filename="{os.path.basename(path)}"'
+        })
+
+    async def start(self):
+        """Start listening; calling it again is a no-op"""
+        if self.runner is not None:
+            return
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        print(f"Download server listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+        if self.counts_store:
+            self.counts_store.flush()
+
+    def stats(self):
+        return {
+            "downloads": self.downloads,
+            "rejected": self.rejected,
+            "bytes_served": self.bytes_served,
+            "active_links": len(self.counts)
+        }
@@ -0,0 +1,59 @@
+# services/edit_coalescer.py
+import asyncio
+import time
+
+
+class EditCoalescer:
+    """Coalesces repeated message edits per key.
+
+    `request()` records that a message needs re-rendering and returns
+    immediately. At most one edit per key runs every `interval` seconds, and
+    each edit renders the latest state at the time it runs, so bursts of
+    changes collapse into a single API call without ever publishing stale data.
+    """
+
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.pending = {}
+        self.tasks = {}
+        self.last_edit = {}
+        self.edits_performed = 0
+        self.edits_coalesced = 0
+
+    def request(self, key, render, publish):
+        """Schedule `await publish(render())` for key, merged with any pending request"""
+        if key in self.pending:
+            self.edits_coalesced += 1
+        self.pending[key] = (render, publish)
+        if key not in self.tasks:
+            self.tasks[key] = asyncio.create_task(self._run(key))
+
+    async def _run(self, key):
+        try:
+            while key in self.pending:
+                wait = self.last_edit.get(key, 0) + self.interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                render, publish = self.pending.pop(key)
+                self.last_edit[key] = time.monotonic()
+                try:
+                    await publish(render())
+                    self.edits_performed += 1
+                except Exception as e:
+                    print(f"Error publishing coalesced edit for {key}: {e}")
+        finally:
+            if self.tasks.get(key) is asyncio.current_task():
+                del self.tasks[key]
+
+    def cancel(self, key):
+        """Drop pending edits for key (e.g. when the message is about to be replaced)"""
+        self.pending.pop(key, None)
+        self.last_edit.pop(key, None)
+        task = self.tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def cancel_all(self):
+        for key in list(self.tasks):
+            self.cancel(key)
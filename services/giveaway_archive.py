@@ -0,0 +1,69 @@
+# services/giveaway_archive.py
+import datetime
+import os
+
+from common import load_json
+from services.persistence import DebouncedJSONFile
+
+
+class GiveawayArchive:
+    """Ended giveaways keyed by message id, with their entrants and drawn winners.
+
+    Entries older than `retention_days` are dropped, and only the newest
+    `max_entries` are kept, so the file stays bounded.
+    """
+
+    def __init__(self, path, retention_days=30, max_entries=500, flush_interval=2.0):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_entries = max_entries
+        self.entries = load_json(path) if os.path.exists(path) else {}
+        # Participant lists can be large, so the archive is written compactly
+        self.store = DebouncedJSONFile(path, lambda: self.entries, flush_interval, indent=None)
+        if self.prune():
+            self.store.mark_dirty()
+
+    def prune(self):
+        """Apply the retention policy; returns the number of entries removed"""
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=self.retention_days)).isoformat()
+        expired = [key for key, entry in self.entries.items() if entry["ended_at"] < cutoff]
+        for key in expired:
+            del self.entries[key]
+
+        # Entries are inserted in the order giveaways end, oldest first
+        overflow = len(self.entries) - self.max_entries
+        for key in list(self.entries)[:max(overflow, 0)]:
+            del self.entries[key]
+        return len(expired) + max(overflow, 0)
+
+    def add(self, giveaway, winners, draw=None):
+        self.entries[str(giveaway["message_id"])] = {
+            "channel_id": giveaway["channel_id"],
+            "message_id": giveaway["message_id"],
+            "prize": giveaway["prize"],
+            "winners_count": giveaway["winners_count"],
+            "host_id": giveaway["host_id"],
+            "description": giveaway.get("description", ""),
+            "participants": list(giveaway["participants"]),
+            "winners": list(winners),
+            # Seed and weights of every draw, so each can be reproduced
+            "draws": [draw] if draw else [],
+            "ended_at": datetime.datetime.now().isoformat()
+        }
+        self.prune()
+        self.store.mark_dirty()
+
+    def get(self, message_id):
+        return self.entries.get(str(message_id))
+
+    def record_winners(self, message_id, winners, draw=None):
+        """Remember rerolled winners so later rerolls exclude them too"""
+        entry = self.get(message_id)
+        if entry is not None:
+            entry["winners"].extend(winners)
+            if draw:
+                entry.setdefault("draws", []).append(draw)
+            self.store.mark_dirty()
+
+    def flush(self):
+        self.store.flush()
@@ -0,0 +1,147 @@
+# services/giveaway_journal.py
+import asyncio
+import json
+import os
+
+
+class EntryJournal:
+    """Append-only journal of giveaway entries: one [message_id, user_id, entered] per line.
+
+    Records are explicit enter/leave operations rather than toggles, so
+    replaying a record that is already reflected in the snapshot is harmless.
+    Compaction rotates the journal aside, writes a fresh snapshot, then
+    deletes the rotated file; recovery replays the rotated file (if a crash
+    left one behind) followed by the live journal on top of the snapshot.
+    """
+
+    def __init__(self, path, fsync_interval=1.0):
+        self.path = path
+        self.rotated_path = f"{path}.compacting"
+        # The live journal between being moved aside and merged into rotated_path
+        self.pending_path = f"{path}.rotating"
+        self.fsync_interval = fsync_interval
+        self.handle = None
+        self.sync_timer = None
+        self.records = 0
+        self.bytes_written = 0
+
+    def _open(self):
+        if self.handle is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.handle = open(self.path, "a", encoding="utf-8")
+        return self.handle
+
+    def append(self, message_id, user_id, entered):
+        line = json.dumps([message_id, user_id, 1 if entered else 0]) + "\n"
+        handle = self._open()
+        handle.write(line)
+        handle.flush()
+        self.records += 1
+        self.bytes_written += len(line)
+        self._schedule_sync()
+
+    def _schedule_sync(self):
+        if self.sync_timer is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.sync()
+            return
+        self.sync_timer = loop.call_later(self.fsync_interval, self._sync_in_background, loop)
+
+    def _sync_in_background(self, loop):
+        self.sync_timer = None
+        if self.handle is not None:
+            loop.run_in_executor(None, self._fsync, self.handle.fileno())
+
+    @staticmethod
+    def _fsync(fd):
+        try:
+            os.fsync(fd)
+        except OSError:
+            # The journal was rotated and closed (and synced) meanwhile
+            pass
+
+    def sync(self):
+        if self.sync_timer is not None:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        if self.handle is not None:
+            self._fsync(self.handle.fileno())
+
+    def _close(self):
+        if self.handle is not None:
+            self.sync()
+            self.handle.close()
+            self.handle = None
+
+    def replay(self):
+        """Yield (message_id, user_id, entered) from the rotated and live journals"""
+        for path in (self.rotated_path, self.pending_path, self.path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    for line in file:
+                        try:
+                            message_id, user_id, entered = json.loads(line)
+                        except ValueError:
+                            # Torn final line from a crash mid-write
+                            continue
+                        yield message_id, user_id, bool(entered)
+            except FileNotFoundError:
+                continue
+
+    def detach(self):
+        """Start a rotation: move the live journal aside without blocking.
+
+        Only a rename happens here, so it is safe on the event loop; appends
+        made afterwards go to a new live journal. Returns the old handle,
+        which `finish_rotation()` syncs and closes (on a worker thread).
+        """
+        if os.path.exists(self.pending_path):
+            # A rotation was interrupted by a crash; complete it first
+            self._merge_pending()
+        if self.sync_timer is not None:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        handle, self.handle = self.handle, None
+        if os.path.exists(self.path):
+            os.replace(self.path, self.pending_path)
+        self.records = 0
+        return handle
+
+    def finish_rotation(self, handle):
+        """Sync and close the detached handle and fold its records into the rotated journal"""
+        if handle is not None:
+            self._fsync(handle.fileno())
+            handle.close()
+        if os.path.exists(self.pending_path):
+            self._merge_pending()
+
+    def _merge_pending(self):
+        if os.path.exists(self.rotated_path):
+            # An earlier compaction never finished; keep both sets of records
+            with open(self.rotated_path, "a+", encoding="utf-8") as rotated, open(self.pending_path, "r", encoding="utf-8") as pending:
+                rotated.seek(0, os.SEEK_END)
+                if rotated.tell():
+                    # Keep a torn final line from gluing onto the next record
+                    rotated.write("\n")
+                rotated.write(pending.read())
+            os.remove(self.pending_path)
+        else:
+            os.replace(self.pending_path, self.rotated_path)
+
+    def rotate(self):
+        """Move the live journal aside before a snapshot is taken"""
+        self.finish_rotation(self.detach())
+
+    def discard_rotated(self):
+        """Delete the rotated journal once the snapshot covering it is on disk"""
+        try:
+            os.remove(self.rotated_path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        self._close()
@@ -0,0 +1,63 @@
+# services/giveaway_registry.py
+
+
+class ParticipantSet:
+    """Insertion-ordered set of participant user ids.
+
+    Backed by a dict so membership checks, entering and leaving are all O(1)
+    while iteration order still matches the order users entered, which is
+    what giveaways.json has always stored.
+    """
+
+    __slots__ = ("_ids",)
+
+    def __init__(self, user_ids=()):
+        self._ids = dict.fromkeys(user_ids)
+
+    def toggle(self, user_id):
+        """Enter or leave; returns True if the user is now entered"""
+        if user_id in self._ids:
+            del self._ids[user_id]
+            return False
+        self._ids[user_id] = None
+        return True
+
+    def add(self, user_id):
+        self._ids[user_id] = None
+
+    def discard(self, user_id):
+        self._ids.pop(user_id, None)
+
+    def __contains__(self, user_id):
+        return user_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def to_list(self):
+        return list(self._ids)
+
+
+class GiveawayRegistry:
+    """Active giveaways keyed by their message id"""
+
+    def __init__(self):
+        self.by_message = {}
+
+    def add(self, giveaway):
+        self.by_message[giveaway["message_id"]] = giveaway
+
+    def get(self, message_id):
+        return self.by_message.get(message_id)
+
+    def remove(self, message_id):
+        return self.by_message.pop(message_id, None)
+
+    def __iter__(self):
+        return iter(list(self.by_message.values()))
+
+    def __len__(self):
+        return len(self.by_message)
@@ -0,0 +1,142 @@
+# services/guild_resolver.py
+
+
+class GuildResolver:
+    """Cached name -> role / category / text channel lookups per guild.
+
+    Each (guild, kind) index maps names to ids and is built on first use,
+    replacing a linear scan of `guild.roles` / `guild.categories` on every
+    call. Role events drop the guild's role index; channel events patch only
+    the entries of the channel concerned, so renaming an order channel does
+    not force a rebuild. Both are registered in `attach()`. Ids are resolved
+    back through the guild's own caches, so a deleted object is never
+    returned.
+    """
+
+    KINDS = {
+        "role": lambda guild: guild.roles,
+        "category": lambda guild: guild.categories,
+        "channel": lambda guild: guild.text_channels
+    }
+    GETTERS = {
+        "role": lambda guild, object_id: guild.get_role(object_id),
+        "category": lambda guild, object_id: guild.get_channel(object_id),
+        "channel": lambda guild, object_id: guild.get_channel(object_id)
+    }
+
+    def __init__(self):
+        self.indexes = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.updates = 0
+
+    def _index(self, guild, kind):
+        key = (guild.id, kind)
+        index = self.indexes.get(key)
+        if index is not None:
+            self.hits += 1
+            return index
+
+        self.misses += 1
+        index = {}
+        for item in self.KINDS[kind](guild):
+            # Same as a linear scan: the first object with a name wins
+            index.setdefault(item.name, item.id)
+        self.indexes[key] = index
+        return index
+
+    def resolve(self, guild, kind, name):
+        object_id = self._index(guild, kind).get(name)
+        if object_id is None:
+            return None
+        item = self.GETTERS[kind](guild, object_id)
+        if item is None or item.name != name:
+            # An event was missed; rebuild from the guild's current state
+            self.invalidate(guild.id, kind)
+            object_id = self._index(guild, kind).get(name)
+            item = self.GETTERS[kind](guild, object_id) if object_id is not None else None
+        return item
+
+    def role(self, guild, name):
+        return self.resolve(guild, "role", name)
+
+    def category(self, guild, name):
+        return self.resolve(guild, "category", name)
+
+    def channel(self, guild, name):
+        return self.resolve(guild, "channel", name)
+
+    def invalidate(self, guild_id, *kinds):
+        """Drop the given indexes for a guild (all of them when no kind is given)"""
+        for kind in kinds or self.KINDS:
+            if self.indexes.pop((guild_id, kind), None) is not None:
+                self.invalidations += 1
+
+    @staticmethod
+    def _channel_kind(channel):
+        """Index a channel belongs to: categories and text (or news) channels only"""
+        channel_type = str(channel.type)
+        if channel_type == "category":
+            return "category"
+        if channel_type in ("text", "news"):
+            return "channel"
+        return None
+
+    def _add_channel(self, channel):
+        kind = self._channel_kind(channel)
+        index = self.indexes.get((channel.guild.id, kind))
+        if index is not None:
+            index.setdefault(channel.name, channel.id)
+            self.updates += 1
+
+    def _remove_channel(self, channel):
+        kind = self._channel_kind(channel)
+        index = self.indexes.get((channel.guild.id, kind))
+        if index is None or index.get(channel.name) != channel.id:
+            return
+        del index[channel.name]
+        self.updates += 1
+        # Another channel with the same name is what a linear scan would now find
+        for item in self.KINDS[kind](channel.guild):
+            if item.name == channel.name and item.id != channel.id:
+                index[channel.name] = item.id
+                break
+
+    # Gateway event handlers
+    async def on_role_event(self, role, after=None):
+        self.invalidate(role.guild.id, "role")
+
+    async def on_channel_create(self, channel):
+        self._add_channel(channel)
+
+    async def on_channel_delete(self, channel):
+        self._remove_channel(channel)
+
+    async def on_channel_update(self, before, after):
+        if self._channel_kind(before) != self._channel_kind(after):
+            self.invalidate(before.guild.id, "category", "channel")
+        elif before.name != after.name:
+            self._remove_channel(before)
+            self._add_channel(after)
+
+    async def on_guild_remove(self, guild):
+        self.invalidate(guild.id)
+
+    def attach(self, bot):
+        """Register the invalidation listeners on the bot"""
+        for event in ("on_guild_role_create", "on_guild_role_update", "on_guild_role_delete"):
+            bot.add_listener(self.on_role_event, event)
+        bot.add_listener(self.on_channel_create, "on_guild_channel_create")
+        bot.add_listener(self.on_channel_update, "on_guild_channel_update")
+        bot.add_listener(self.on_channel_delete, "on_guild_channel_delete")
+        bot.add_listener(self.on_guild_remove, "on_guild_remove")
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "updates": self.updates,
+            "cached": len(self.indexes)
+        }
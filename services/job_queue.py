@@ -0,0 +1,232 @@
+# services/job_queue.py
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from services.deadline_scheduler import DeadlineScheduler
+
+# Retry delays grow as BACKOFF_BASE * 2 ** (attempt - 1), up to BACKOFF_MAX
+BACKOFF_BASE = 5
+BACKOFF_MAX = 600
+
+
+class JobQueue:
+    """Delayed jobs persisted in SQLite and run by a single scheduler task.
+
+    `enqueue(kind, payload, delay)` stores a job and hands it to a
+    DeadlineScheduler, which runs due jobs through the handler registered for
+    their kind, at most `max_concurrency` at a time. Pending jobs are
+    rescheduled on startup, and jobs that were running when the bot stopped
+    are run again, so handlers should be idempotent. Finished jobs are
+    deleted. A job whose handler raises is retried with exponential backoff
+    while `retryable(error)` allows it and attempts remain; otherwise it is
+    marked failed (the dead-letter list) until `retry()` puts it back.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            run_at REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, run_at);
+    """
+
+    def __init__(self, path, max_concurrency=4):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+        self.handlers = {}
+        self.scheduler = DeadlineScheduler(self._run_job, max_concurrency)
+        self.task = None
+        self.completed = 0
+        self.failed = 0
+        self.kind_stats = {}
+
+        # Jobs interrupted by a restart are run again
+        self.conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+        for job_id, run_at in self.conn.execute("SELECT job_id, run_at FROM jobs WHERE status = 'pending'"):
+            self.scheduler.schedule(job_id, run_at)
+
+    def register(self, kind, handler, max_attempts=1, retryable=None):
+        """Run `await handler(payload)` for jobs of this kind.
+
+        Failed jobs are retried up to `max_attempts` runs in total, but only
+        for errors where `retryable(error)` is true (any error if it is None).
+        """
+        self.handlers[kind] = (handler, max_attempts, retryable)
+
+    def _insert(self, kind, payload, run_at):
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (kind, payload, run_at, created_at) VALUES (?, ?, ?, ?)",
+                (kind, json.dumps(payload), run_at, time.time())
+            )
+        return cursor.lastrowid
+
+    async def enqueue(self, kind, payload, delay=0):
+        """Persist a job that runs `delay` seconds from now; returns its id"""
+        run_at = time.time() + delay
+        job_id = await asyncio.to_thread(self._insert, kind, payload, run_at)
+        self.scheduler.schedule(job_id, run_at)
+        return job_id
+
+    def _claim(self, job_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT kind, payload, attempts, created_at FROM jobs WHERE job_id = ? AND status = 'pending'", (job_id,)
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1 WHERE job_id = ?", (job_id,)
+                )
+        return row
+
+    def _finish(self, job_id, error=None, retry_at=None):
+        with self.lock:
+            if error is None:
+                self.conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            elif retry_at is not None:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'pending', run_at = ?, last_error = ? WHERE job_id = ?",
+                    (retry_at, error, job_id)
+                )
+            else:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'failed', last_error = ? WHERE job_id = ?", (error, job_id)
+                )
+
+    def _kind_stats(self, kind):
+        return self.kind_stats.setdefault(kind, {"completed": 0, "failed": 0, "retries": 0, "latency_total": 0.0})
+
+    async def _run_job(self, job_id):
+        row = await asyncio.to_thread(self._claim, job_id)
+        if row is None:
+            return
+        kind, payload, attempts, created_at = row
+        attempts += 1
+        stats = self._kind_stats(kind)
+
+        error = None
+        retry_at = None
+        handler, max_attempts, retryable = self.handlers.get(kind, (None, 1, None))
+        if handler is None:
+            error = f"No handler registered for {kind}"
+        else:
+            try:
+                await handler(json.loads(payload))
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                if attempts < max_attempts and (retryable is None or retryable(e)):
+                    # Jitter keeps retries of a burst of failures from landing together
+                    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+                    retry_at = time.time() + delay * random.uniform(0.8, 1.2)
+
+        if error is None:
+            self.completed += 1
+            stats["completed"] += 1
+            stats["latency_total"] += time.time() - created_at
+        elif retry_at is not None:
+            stats["retries"] += 1
+            print(f"Job {job_id} ({kind}) failed, retrying in {retry_at - time.time():.0f}s: {error}")
+        else:
+            self.failed += 1
+            stats["failed"] += 1
+            print(f"Job {job_id} ({kind}) failed: {error}")
+        await asyncio.to_thread(self._finish, job_id, error, retry_at)
+        if retry_at is not None:
+            self.scheduler.schedule(job_id, retry_at)
+
+    def _requeue(self, job_id, kind):
+        with self.lock:
+            if job_id is not None:
+                rows = self.conn.execute(
+                    "SELECT job_id FROM jobs WHERE job_id = ? AND status = 'failed'", (job_id,)
+                ).fetchall()
+            elif kind is not None:
+                rows = self.conn.execute(
+                    "SELECT job_id FROM jobs WHERE kind = ? AND status = 'failed'", (kind,)
+                ).fetchall()
+            else:
+                rows = self.conn.execute("SELECT job_id FROM jobs WHERE status = 'failed'").fetchall()
+            job_ids = [row[0] for row in rows]
+            run_at = time.time()
+            self.conn.executemany(
+                "UPDATE jobs SET status = 'pending', attempts = 0, run_at = ? WHERE job_id = ?",
+                [(run_at, requeued) for requeued in job_ids]
+            )
+        return job_ids, run_at
+
+    async def retry(self, job_id=None, kind=None):
+        """Move failed jobs back to pending: one job, every job of a kind, or all; returns their ids"""
+        job_ids, run_at = await asyncio.to_thread(self._requeue, job_id, kind)
+        for requeued in job_ids:
+            self.scheduler.schedule(requeued, run_at)
+        return job_ids
+
+    def jobs(self, status="pending", limit=10, kind=None):
+        """The next `limit` jobs with the given status (and kind), soonest first"""
+        query = "SELECT job_id, kind, payload, run_at, attempts, last_error FROM jobs WHERE status = ?"
+        params = [status]
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY run_at LIMIT ?", (*params, limit)).fetchall()
+        return [
+            {"job_id": job_id, "kind": kind, "payload": json.loads(payload), "run_at": run_at,
+             "attempts": attempts, "last_error": last_error}
+            for job_id, kind, payload, run_at, attempts, last_error in rows
+        ]
+
+    def counts(self):
+        """Number of stored jobs per status"""
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def start(self):
+        """Start the worker; calling it again is a no-op"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.scheduler.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def close(self):
+        self.stop()
+        with self.lock:
+            self.conn.close()
+
+    def stats(self, kind=None):
+        """Worker counters, or success rate and mean latency for one kind"""
+        if kind is not None:
+            stats = self._kind_stats(kind)
+            finished = stats["completed"] + stats["failed"]
+            return {
+                **stats,
+                "success_rate": stats["completed"] / finished if finished else None,
+                "mean_latency": stats["latency_total"] / stats["completed"] if stats["completed"] else None
+            }
+        return {
+            "scheduled": len(self.scheduler),
+            "completed": self.completed,
+            "failed": self.failed
+        }
@@ -0,0 +1,68 @@
+# services/order_guard.py
+import asyncio
+import time
+
+
+class OrderGuard:
+    """Collapses duplicate buy clicks and rate limits new orders per user.
+
+    `run_once(key, create)` runs `create()` for a (user, product) key, and
+    any click for the same key that arrives while it is running waits for
+    and shares that result instead of creating a second order. `allow()` is
+    a per-user token bucket: `burst` orders at once, then one more every
+    `refill_seconds`.
+    """
+
+    # Full buckets are dropped once this many users are tracked
+    MAX_BUCKETS = 10_000
+
+    def __init__(self, burst=3, refill_seconds=300):
+        self.burst = burst
+        self.refill_seconds = refill_seconds
+        self.in_flight = {}
+        self.buckets = {}
+        self.collapsed = 0
+        self.limited = 0
+
+    async def run_once(self, key, create):
+        """Return (result, created); created is False for a collapsed duplicate"""
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.collapsed += 1
+            return await asyncio.shield(task), False
+
+        task = asyncio.ensure_future(create())
+        self.in_flight[key] = task
+        try:
+            return await asyncio.shield(task), True
+        finally:
+            if self.in_flight.get(key) is task:
+                del self.in_flight[key]
+
+    def _tokens(self, user_id, now):
+        tokens, updated = self.buckets.get(user_id, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) / self.refill_seconds)
+
+    def allow(self, user_id):
+        """Take a token for a new order; returns (allowed, seconds until the next token)"""
+        now = time.monotonic()
+        tokens = self._tokens(user_id, now)
+        if tokens < 1:
+            self.limited += 1
+            self.buckets[user_id] = (tokens, now)
+            return False, (1 - tokens) * self.refill_seconds
+
+        self.buckets[user_id] = (tokens - 1, now)
+        if len(self.buckets) > self.MAX_BUCKETS:
+            # A refilled bucket is the same as no bucket
+            self.buckets = {
+                user: bucket for user, bucket in self.buckets.items() if self._tokens(user, now) < self.burst
+            }
+        return True, 0
+
+    def stats(self):
+        return {
+            "in_flight": len(self.in_flight),
+            "collapsed": self.collapsed,
+            "limited": self.limited
+        }
@@ -0,0 +1,94 @@
+# services/order_store.py
+import datetime
+import os
+import sqlite3
+import threading
+
+ORDER_FIELDS = ("order_id", "channel_id", "buyer_id", "product", "price", "status", "created_at", "updated_at")
+
+
+class OrderStore:
+    """Orders persisted in SQLite and mirrored in memory by channel and buyer.
+
+    Lookups (`for_channel`, `for_buyer`, `get`) only touch the in-memory
+    indexes. Changes are written through to SQLite and are safe to run via
+    `asyncio.to_thread`.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id INTEGER NOT NULL UNIQUE,
+            buyer_id INTEGER NOT NULL,
+            product TEXT NOT NULL,
+            price INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_orders_buyer ON orders (buyer_id);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+        self.orders = {}
+        self.by_channel = {}
+        self.by_buyer = {}
+        for row in self.conn.execute(f"SELECT {', '.join(ORDER_FIELDS)} FROM orders ORDER BY order_id"):
+            self._index(dict(zip(ORDER_FIELDS, row)))
+
+    def _index(self, order):
+        self.orders[order["order_id"]] = order
+        self.by_channel[order["channel_id"]] = order
+        self.by_buyer.setdefault(order["buyer_id"], []).append(order)
+
+    def create(self, channel_id, buyer_id, product, price, status="open"):
+        now = datetime.datetime.now().isoformat()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO orders (channel_id, buyer_id, product, price, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (channel_id, buyer_id, product, price, status, now, now)
+            )
+            order = dict(zip(ORDER_FIELDS, (cursor.lastrowid, channel_id, buyer_id, product, price, status, now, now)))
+            self._index(order)
+        return order
+
+    def update(self, order_id, **fields):
+        """Change fields of an order (e.g. status); returns the updated order"""
+        changes = {name: value for name, value in fields.items() if name in ORDER_FIELDS[1:]}
+        changes["updated_at"] = datetime.datetime.now().isoformat()
+        with self.lock:
+            self.conn.execute(
+                f"UPDATE orders SET {', '.join(f'{name} = ?' for name in changes)} WHERE order_id = ?",
+                (*changes.values(), order_id)
+            )
+            order = self.orders.get(order_id)
+            if order is not None:
+                order.update(changes)
+        return order
+
+    def get(self, order_id):
+        return self.orders.get(order_id)
+
+    def for_channel(self, channel_id):
+        return self.by_channel.get(channel_id)
+
+    def for_buyer(self, buyer_id):
+        return list(self.by_buyer.get(buyer_id, ()))
+
+    def __len__(self):
+        return len(self.orders)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,136 @@
+# services/persistence.py
+import asyncio
+import json
+import os
+import threading
+import weakref
+
+# Every file created through this module, so shutdown can flush them all
+_files = weakref.WeakSet()
+
+
+def atomic_write(path, text):
+    """Write text to path via a temp file and os.replace"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+class DebouncedJSONFile:
+    """Write-behind JSON file with dirty tracking.
+
+    Callers mutate their in-memory data and call `mark_dirty()`. The first
+    call schedules a flush `flush_interval` seconds later; every further call
+    before that flush is coalesced into it. The data is serialized on the
+    event loop (where it is mutated) and the file is written atomically on a
+    worker thread. `flush()` writes synchronously and is meant for
+    `cog_unload` and shutdown.
+    """
+
+    def __init__(self, path, get_data, flush_interval=2.0, indent=4):
+        self.path = path
+        self.get_data = get_data
+        self.flush_interval = flush_interval
+        self.indent = indent
+        self.dirty = False
+        self.timer = None
+        self.write_lock = threading.Lock()
+        self.serial = 0
+        self.written_serial = 0
+        self.writes_performed = 0
+        self.writes_avoided = 0
+        _files.add(self)
+
+    def mark_dirty(self):
+        """Record a change; the file is written at most once per interval"""
+        if self.dirty and self.timer is not None:
+            self.writes_avoided += 1
+            return
+        self.dirty = True
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Outside the event loop (e.g. during cog setup) just write now
+            self.flush()
+            return
+        self.timer = loop.call_later(self.flush_interval, self._flush_in_background, loop)
+
+    def _serialize(self):
+        self.dirty = False
+        self.serial += 1
+        return self.serial, json.dumps(self.get_data(), indent=self.indent)
+
+    def _write(self, serial, text):
+        with self.write_lock:
+            # A newer snapshot may already be on disk
+            if serial <= self.written_serial:
+                return True
+            try:
+                atomic_write(self.path, text)
+                self.written_serial = serial
+                self.writes_performed += 1
+                return True
+            except Exception as e:
+                print(f"Error saving to {self.path}: {e}")
+                return False
+
+    def _written(self, ok):
+        # A failed write leaves the data dirty, so the next flush or change retries it
+        if not ok:
+            self.dirty = True
+        return ok
+
+    def _background_write_done(self, future):
+        if not future.result() and self.timer is None:
+            # Retry after another interval instead of waiting for the next change
+            self.mark_dirty()
+
+    def _flush_in_background(self, loop):
+        self.timer = None
+        if self.dirty:
+            future = loop.run_in_executor(None, self._write, *self._serialize())
+            future.add_done_callback(self._background_write_done)
+
+    def flush(self, force=False):
+        """Write pending changes immediately on the calling thread; returns False if the write failed"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.dirty or force:
+            return self._written(self._write(*self._serialize()))
+        return True
+
+    async def flush_async(self, force=False):
+        """Write pending changes now on a worker thread and wait for the write"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.dirty or force:
+            ok = await asyncio.get_running_loop().run_in_executor(None, self._write, *self._serialize())
+            return self._written(ok)
+        return True
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "dirty": self.dirty,
+            "writes_performed": self.writes_performed,
+            "writes_avoided": self.writes_avoided
+        }
+
+
+def flush_all():
+    """Synchronously flush every debounced file (used on shutdown)"""
+    for store in list(_files):
+        store.flush()
+
+
+def stats():
+    """Write counters for every debounced file"""
+    return [store.stats() for store in list(_files)]
@@ -0,0 +1,141 @@
+# services/product_manifest.py
+import asyncio
+import hashlib
+import os
+
+from common import load_json
+from services.persistence import DebouncedJSONFile
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_directory(directory, previous):
+    """New manifest for directory, re-hashing only files whose size or mtime changed.
+
+    Returns (entries, added, changed, removed).
+    """
+    entries = {}
+    added, changed = [], []
+    try:
+        files = [item for item in os.scandir(directory) if item.is_file()]
+    except FileNotFoundError:
+        files = []
+
+    for item in files:
+        stat = item.stat()
+        old = previous.get(item.name)
+        if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+            entries[item.name] = old
+            continue
+        try:
+            sha256 = file_sha256(item.path)
+        except OSError as e:
+            # Removed or unreadable mid-scan; picked up again next time
+            print(f"Error hashing product file {item.path}: {e}")
+            continue
+        entries[item.name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+        if old is None:
+            added.append(item.name)
+        elif old["sha256"] != sha256:
+            changed.append(item.name)
+
+    removed = [name for name in previous if name not in entries]
+    return entries, added, changed, removed
+
+
+class ProductManifest:
+    """Size, mtime and SHA-256 of every file in the products directory.
+
+    The directory is re-scanned every `poll_interval` seconds on a worker
+    thread; only new or modified files are hashed. Sales look files up here
+    (`get()`) instead of touching the disk, and `check()` compares the
+    manifest with the catalog's `filename` fields. `scan()` is the on-demand
+    rescan: it shares a scan already in progress and reports like the poller.
+    """
+
+    def __init__(self, directory, path, poll_interval=30, flush_interval=2.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.entries = load_json(path) if os.path.exists(path) else {}
+        self.store = DebouncedJSONFile(path, lambda: self.entries, flush_interval)
+        self.task = None
+        self.scan_task = None
+        self.catalog = None
+        self.scans = 0
+        self.problems = []
+
+    def get(self, filename):
+        """Manifest entry for a product file, or None if it is missing"""
+        return self.entries.get(filename)
+
+    async def refresh(self):
+        """Re-scan the directory; returns (added, changed, removed) filenames"""
+        entries, added, changed, removed = await asyncio.to_thread(scan_directory, self.directory, dict(self.entries))
+        self.entries = entries
+        self.scans += 1
+        if added or changed or removed:
+            self.store.mark_dirty()
+        return added, changed, removed
+
+    def check(self, products):
+        """Catalog products whose file is missing from the products directory"""
+        problems = []
+        for product_name, product_data in products.items():
+            filename = product_data.get("filename")
+            if filename and filename not in self.entries:
+                problems.append(f"{product_name}: {filename} is missing")
+        self.problems = problems
+        return problems
+
+    def report(self, products, changed=()):
+        """Print catalog files that are missing or were just modified"""
+        for problem in self.check(products):
+            print(f"Product manifest: {problem}")
+        referenced = {product_data.get("filename") for product_data in products.values()}
+        for filename in changed:
+            if filename in referenced:
+                print(f"Product manifest: {filename} changed (sha256 {self.entries[filename]['sha256']})")
+
+    async def _scan(self):
+        added, changed, removed = await self.refresh()
+        if self.catalog is not None and (added or changed or removed or self.scans == 1):
+            self.report(self.catalog.products, changed)
+
+    async def scan(self):
+        """Re-scan now and report changes; concurrent callers share one scan"""
+        if self.scan_task is None or self.scan_task.done():
+            self.scan_task = asyncio.ensure_future(self._scan())
+        # A cancelled caller must not cancel the scan others are waiting on
+        await asyncio.shield(self.scan_task)
+
+    async def run(self):
+        while True:
+            try:
+                await self.scan()
+            except Exception as e:
+                print(f"Error scanning {self.directory}: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self, catalog):
+        """Start polling (safe to call more than once); the first scan reports against the catalog"""
+        self.catalog = catalog
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def stats(self):
+        return {
+            "files": len(self.entries),
+            "scans": self.scans,
+            "problems": len(self.problems)
+        }
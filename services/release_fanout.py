@@ -0,0 +1,173 @@
+# services/release_fanout.py
+import asyncio
+import bisect
+import os
+import sqlite3
+import threading
+import time
+
+RELEASE_FIELDS = (
+    "release_id", "product", "message", "include_file", "status", "cursor", "sent", "failed", "total", "created_at"
+)
+
+
+class ReleaseFanout:
+    """Resumable, rate-limited notification of every owner of a product.
+
+    Each release stores a cursor: the last owner id it handled. Owners are
+    visited in sorted id order, at most `rate` per second, and the cursor is
+    saved after every owner, so a restart resumes where it stopped and at
+    most one owner can be notified twice. `send(user_id, release)` delivers
+    one notice; errors for which `retryable(error)` is true are retried with
+    backoff, anything else counts as failed and the release moves on.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS releases (
+            release_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product TEXT NOT NULL,
+            message TEXT NOT NULL,
+            include_file INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'running',
+            cursor TEXT NOT NULL DEFAULT '',
+            sent INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path, owners_of, send, retryable=None, rate=5, max_attempts=5):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+        self.owners_of = owners_of
+        self.send = send
+        self.retryable = retryable
+        self.interval = 1 / rate
+        self.max_attempts = max_attempts
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.cancelled = set()
+
+    def _select(self, where="", params=(), limit=None):
+        query = f"SELECT {', '.join(RELEASE_FIELDS)} FROM releases {where} ORDER BY release_id"
+        if limit:
+            query += f" DESC LIMIT {int(limit)}"
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [dict(zip(RELEASE_FIELDS, row)) for row in rows]
+
+    def _insert(self, product, message, include_file, total):
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO releases (product, message, include_file, total, created_at) VALUES (?, ?, ?, ?, ?)",
+                (product, message, int(include_file), total, time.time())
+            )
+        return cursor.lastrowid
+
+    def _advance(self, release_id, user_id, delivered):
+        column = "sent" if delivered else "failed"
+        with self.lock:
+            self.conn.execute(
+                f"UPDATE releases SET cursor = ?, {column} = {column} + 1 WHERE release_id = ?",
+                (user_id, release_id)
+            )
+
+    def _set_status(self, release_id, status):
+        with self.lock:
+            self.conn.execute("UPDATE releases SET status = ? WHERE release_id = ?", (status, release_id))
+
+    async def create(self, product, message, include_file=False):
+        """Start notifying every current owner of product; returns the new release"""
+        owners = await asyncio.to_thread(self.owners_of, product)
+        release_id = await asyncio.to_thread(self._insert, product, message, include_file, len(owners))
+        self.wakeup.set()
+        return self.get(release_id)
+
+    def get(self, release_id):
+        releases = self._select("WHERE release_id = ?", (release_id,))
+        return releases[0] if releases else None
+
+    def releases(self, limit=5):
+        """The most recent releases, newest first"""
+        return self._select(limit=limit)
+
+    async def cancel(self, release_id):
+        """Stop a running release; returns False if it was not running"""
+        release = self.get(release_id)
+        if not release or release["status"] != "running":
+            return False
+        self.cancelled.add(release_id)
+        await asyncio.to_thread(self._set_status, release_id, "cancelled")
+        return True
+
+    async def _deliver(self, user_id, release):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.send(user_id, release)
+                return True
+            except Exception as e:
+                if attempt == self.max_attempts or (self.retryable and not self.retryable(e)):
+                    print(f"Release {release['release_id']}: could not notify {user_id}: {e}")
+                    return False
+                await asyncio.sleep(min(5 * 2 ** (attempt - 1), 300))
+        return False
+
+    async def _run_release(self, release):
+        # Owners are visited in sorted order, so the cursor marks everyone already handled
+        owners = sorted(await asyncio.to_thread(self.owners_of, release["product"]))
+        for user_id in owners[bisect.bisect_right(owners, release["cursor"]):]:
+            if release["release_id"] in self.cancelled:
+                return
+            started = time.monotonic()
+            delivered = await self._deliver(user_id, release)
+            await asyncio.to_thread(self._advance, release["release_id"], user_id, delivered)
+            # Pace sends to stay well under Discord's global rate limit
+            await asyncio.sleep(max(0, self.interval - (time.monotonic() - started)))
+        await asyncio.to_thread(self._set_status, release["release_id"], "done")
+        print(f"Release {release['release_id']} of {release['product']} finished")
+
+    async def run(self):
+        """Work through running releases one at a time, oldest first"""
+        while True:
+            self.wakeup.clear()
+            running = await asyncio.to_thread(self._select, "WHERE status = 'running'")
+            if not running:
+                await self.wakeup.wait()
+                continue
+            try:
+                await self._run_release(running[0])
+            except Exception as e:
+                print(f"Error running release {running[0]['release_id']}: {e}")
+                await asyncio.sleep(60)
+
+    def stats(self):
+        with self.lock:
+            running, sent, failed = self.conn.execute(
+                "SELECT COUNT(CASE WHEN status = 'running' THEN 1 END), COALESCE(SUM(sent), 0), "
+                "COALESCE(SUM(failed), 0) FROM releases"
+            ).fetchone()
+        return {"running": running, "sent": sent, "failed": failed}
+
+    def start(self):
+        """Start (or resume) the worker; calling it again is a no-op"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def close(self):
+        self.stop()
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,48 @@
+# services/startup_timer.py
+import json
+import os
+import time
+
+
+class StartupTimer:
+    """Records how long each startup phase takes and reports it once ready"""
+
+    def __init__(self, started_at=None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.last_mark = self.started_at
+        self.phases = []
+        self.reported = False
+
+    def mark(self, phase):
+        """Close the current phase, timing it from the previous mark"""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last_mark) * 1000))
+        self.last_mark = now
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def report(self, log_path=None):
+        """Print the phase breakdown and append it to the timings log"""
+        if self.reported:
+            return
+        self.reported = True
+
+        total = self.elapsed_ms()
+        print(f"Startup timing ({total:.0f} ms total):")
+        for phase, duration in self.phases:
+            print(f"  {phase:<28} {duration:8.1f} ms")
+
+        if not log_path:
+            return
+        try:
+            if os.path.dirname(log_path):
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            with open(log_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps({
+                    "timestamp": time.time(),
+                    "total_ms": round(total, 1),
+                    "phases": {phase: round(duration, 1) for phase, duration in self.phases}
+                }) + "\n")
+        except Exception as e:
+            print(f"Error writing startup timings: {e}")
@@ -0,0 +1,41 @@
+# services/ticket_index.py
+
+
+class TicketIndex:
+    """In-memory secondary indexes over tickets.json data.
+
+    - by_channel: channel_id -> (guild_id, ticket_id), for every ticket
+    - open_by_user: (guild_id, user_id) -> ticket_id, for open tickets only
+
+    Built once from the loaded data and updated on create/close, so the
+    message and modal handlers no longer scan every ticket ever created.
+    """
+
+    def __init__(self):
+        self.by_channel = {}
+        self.open_by_user = {}
+
+    def rebuild(self, tickets_data):
+        self.by_channel.clear()
+        self.open_by_user.clear()
+        for guild_id, guild_data in tickets_data.items():
+            for ticket_id, ticket in guild_data.get("tickets", {}).items():
+                self.add(guild_id, ticket_id, ticket)
+
+    def add(self, guild_id, ticket_id, ticket):
+        self.by_channel[ticket["channel_id"]] = (guild_id, ticket_id)
+        if ticket["status"] == "open":
+            self.open_by_user[(guild_id, ticket["user_id"])] = ticket_id
+
+    def close(self, guild_id, ticket_id, ticket):
+        key = (guild_id, ticket["user_id"])
+        if self.open_by_user.get(key) == ticket_id:
+            del self.open_by_user[key]
+
+    def ticket_for_channel(self, channel_id):
+        """Return (guild_id, ticket_id) for a ticket channel, or None"""
+        return self.by_channel.get(str(channel_id))
+
+    def open_ticket_for_user(self, guild_id, user_id):
+        """Return the id of the user's open ticket in a guild, or None"""
+        return self.open_by_user.get((str(guild_id), str(user_id)))
@@ -0,0 +1,148 @@
+# services/ticket_log.py
+import asyncio
+import json
+import os
+from collections import OrderedDict
+
+
+class TicketMessageLog:
+    """Append-only JSONL segment per ticket: <base_dir>/<guild_id>/<ticket_id>.jsonl
+
+    Appends are written to the OS straight away; fsync is batched so a busy
+    ticket channel costs one fsync per `fsync_interval` rather than one per
+    message. Open handles are kept in a small LRU so active tickets do not
+    reopen their segment for every line.
+    """
+
+    def __init__(self, base_dir, fsync_interval=1.0, max_open_files=64):
+        self.base_dir = base_dir
+        self.fsync_interval = fsync_interval
+        self.max_open_files = max_open_files
+        self.handles = OrderedDict()
+        self.unsynced = set()
+        self.sync_timer = None
+
+    def segment_path(self, guild_id, ticket_id):
+        return os.path.join(self.base_dir, str(guild_id), f"{ticket_id}.jsonl")
+
+    def exists(self, guild_id, ticket_id):
+        return os.path.exists(self.segment_path(guild_id, ticket_id))
+
+    def _handle(self, key):
+        handle = self.handles.get(key)
+        if handle is not None:
+            self.handles.move_to_end(key)
+            return handle
+
+        path = self.segment_path(*key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle = open(path, "a", encoding="utf-8")
+        if handle.tell() and not self._ends_with_newline(path):
+            # Terminate a torn line from a crash so the next record starts on its own line
+            handle.write("\n")
+        self.handles[key] = handle
+
+        # Evict the least recently used segment
+        if len(self.handles) > self.max_open_files:
+            old_key, old_handle = self.handles.popitem(last=False)
+            self._close_handle(old_key, old_handle)
+        return handle
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+    def _close_handle(self, key, handle):
+        try:
+            handle.flush()
+            os.fsync(handle.fileno())
+            handle.close()
+        except Exception as e:
+            print(f"Error closing ticket log {self.segment_path(*key)}: {e}")
+        self.unsynced.discard(key)
+
+    def append(self, guild_id, ticket_id, record):
+        """Append one message record to a ticket's segment"""
+        self.extend(guild_id, ticket_id, [record])
+
+    def extend(self, guild_id, ticket_id, records):
+        key = (str(guild_id), str(ticket_id))
+        handle = self._handle(key)
+        handle.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        handle.flush()
+        self.unsynced.add(key)
+        self._schedule_sync()
+
+    def _schedule_sync(self):
+        if self.sync_timer is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.sync()
+            return
+        self.sync_timer = loop.call_later(self.fsync_interval, self._sync_in_background, loop)
+
+    def _sync_in_background(self, loop):
+        self.sync_timer = None
+        fds = [self.handles[key].fileno() for key in self.unsynced if key in self.handles]
+        self.unsynced.clear()
+        loop.run_in_executor(None, self._fsync_all, fds)
+
+    @staticmethod
+    def _fsync_all(fds):
+        for fd in fds:
+            try:
+                os.fsync(fd)
+            except OSError:
+                # The handle was evicted and closed (and synced) meanwhile
+                pass
+
+    def sync(self):
+        """fsync every segment with unsynced appends on the calling thread"""
+        if self.sync_timer is not None:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        self._fsync_all([self.handles[key].fileno() for key in self.unsynced if key in self.handles])
+        self.unsynced.clear()
+
+    def read(self, guild_id, ticket_id):
+        """Lazily yield the records of a ticket, oldest first"""
+        key = (str(guild_id), str(ticket_id))
+        if key in self.handles:
+            self.handles[key].flush()
+        try:
+            with open(self.segment_path(*key), "r", encoding="utf-8") as file:
+                torn = None
+                for number, line in enumerate(file, 1):
+                    if not line.strip():
+                        continue
+                    if torn is not None:
+                        # Only the last line can be torn by a crash; anything earlier is corruption
+                        print(f"Skipped corrupt line {torn} in {self.segment_path(*key)}")
+                        torn = None
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        torn = number
+                        continue
+                    yield record
+        except FileNotFoundError:
+            return
+
+    def close_ticket(self, guild_id, ticket_id):
+        """Sync and release the handle of a ticket that was closed"""
+        key = (str(guild_id), str(ticket_id))
+        handle = self.handles.pop(key, None)
+        if handle is not None:
+            self._close_handle(key, handle)
+
+    def close(self):
+        if self.sync_timer is not None:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        while self.handles:
+            key, handle = self.handles.popitem(last=False)
+            self._close_handle(key, handle)
@@ -0,0 +1,125 @@
+# services/ticket_search.py
+import os
+import re
+import sqlite3
+import threading
+
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, last one as a prefix"""
+    terms = [term.replace('"', '""') for term in re.findall(r"\w+", text)]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class TicketSearchIndex:
+    """SQLite FTS5 index over closed tickets and their messages.
+
+    Indexing and searching are blocking calls; the ticket cog runs them on
+    a worker thread so the live ticket handlers never wait on the index.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS ticket_docs (
+            id INTEGER PRIMARY KEY,
+            guild_id TEXT NOT NULL,
+            ticket_id TEXT NOT NULL,
+            user_id TEXT,
+            closed_at TEXT,
+            jump_url TEXT,
+            UNIQUE (guild_id, ticket_id)
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS ticket_fts USING fts5(
+            category, issue, body,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def indexed_tickets(self):
+        """Return the set of (guild_id, ticket_id) pairs already indexed"""
+        with self.lock:
+            return set(self.conn.execute("SELECT guild_id, ticket_id FROM ticket_docs"))
+
+    def index_ticket(self, guild_id, ticket, records, jump_url=None):
+        """(Re)index one closed ticket from its metadata and message log records"""
+        lines = []
+        for record in records:
+            parts = [record.get("content") or ""]
+            for embed in record.get("embeds", []):
+                parts.append(embed.get("title") or "")
+                parts.append(embed.get("description") or "")
+                parts.extend(f"{field['name']} {field['value']}" for field in embed.get("fields", []))
+            text = " ".join(part for part in parts if part)
+            if text:
+                lines.append(f"{record.get('author_name', '')}: {text}")
+
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT id FROM ticket_docs WHERE guild_id = ? AND ticket_id = ?",
+                    (str(guild_id), ticket["ticket_id"])
+                ).fetchone()
+                if row:
+                    self.conn.execute("DELETE FROM ticket_fts WHERE rowid = ?", row)
+                    self.conn.execute("DELETE FROM ticket_docs WHERE id = ?", row)
+
+                doc_id = self.conn.execute(
+                    "INSERT INTO ticket_docs (guild_id, ticket_id, user_id, closed_at, jump_url) VALUES (?, ?, ?, ?, ?)",
+                    (str(guild_id), ticket["ticket_id"], ticket.get("user_id"), ticket.get("closed_at"), jump_url)
+                ).lastrowid
+                self.conn.execute(
+                    "INSERT INTO ticket_fts (rowid, category, issue, body) VALUES (?, ?, ?, ?)",
+                    (doc_id, ticket.get("category", ""), ticket.get("issue", ""), "\n".join(lines))
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def search(self, guild_id, text, limit=10):
+        """Return ranked hits as dicts with ticket metadata and a highlighted snippet"""
+        query = build_match_query(text)
+        if not query:
+            return []
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT d.ticket_id, d.user_id, d.closed_at, d.jump_url, f.category,
+                       snippet(ticket_fts, -1, '**', '**', '…', 16) AS snippet
+                FROM ticket_fts f
+                JOIN ticket_docs d ON d.id = f.rowid
+                WHERE ticket_fts MATCH ? AND d.guild_id = ?
+                ORDER BY bm25(ticket_fts, 2.0, 5.0, 1.0)
+                LIMIT ?
+                """,
+                (query, str(guild_id), limit)
+            ).fetchall()
+        return [
+            {
+                "ticket_id": ticket_id,
+                "user_id": user_id,
+                "closed_at": closed_at,
+                "jump_url": jump_url,
+                "category": category,
+                "snippet": snippet
+            }
+            for ticket_id, user_id, closed_at, jump_url, category, snippet in rows
+        ]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,161 @@
+# services/transcript.py
+import datetime
+import gzip
+import html
+import shutil
+import tempfile
+import time
+from typing import NamedTuple
+
+# Transcripts larger than this stay on disk instead of in memory while rendering
+SPOOL_MAX_MEMORY = 2 * 1024 * 1024
+# Transcripts larger than this are gzipped before upload when compress=None
+GZIP_THRESHOLD = 8 * 1024 * 1024
+
+HEADER = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Ticket #{ticket_id} - {category}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f5f5f5; }}
+        .container {{ max-width: 800px; margin: 0 auto; background-color: white; border-radius: 5px; padding: 20px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
+        .header {{ border-bottom: 1px solid #eee; padding-bottom: 10px; margin-bottom: 20px; }}
+        .message {{ display: flex; margin-bottom: 15px; }}
+        .avatar {{ width: 40px; height: 40px; border-radius: 50%; margin-right: 10px; }}
+        .message-content {{ flex: 1; }}
+        .message-header {{ display: flex; align-items: center; margin-bottom: 5px; }}
+        .author-name {{ font-weight: bold; margin-right: 10px; }}
+        .timestamp {{ color: #999; font-size: 0.8em; }}
+        .message-text {{ background-color: #f9f9f9; padding: 10px; border-radius: 5px; white-space: pre-wrap; }}
+        .embed {{ background-color: #f0f0f0; border-left: 4px solid #7289da; padding: 10px; margin-top: 5px; }}
+        .embed-title {{ font-weight: bold; margin-bottom: 5px; }}
+        .embed-description {{ margin-bottom: 10px; }}
+        .embed-field {{ margin-top: 5px; }}
+        .field-name {{ font-weight: bold; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h2>Ticket #{ticket_id} - {category}</h2>
+            <p><strong>Issue:</strong> {issue}</p>
+            <p><strong>Created:</strong> {created}</p>
+            <p><strong>Closed:</strong> {closed}</p>
+        </div>
+        <div class="messages">
+"""
+
+MESSAGE = """
+            <div class="message">
+                <img class="avatar" src="{avatar}" alt="{author}">
+                <div class="message-content">
+                    <div class="message-header">
+                        <div class="author-name">{author}</div>
+                        <div class="timestamp">{timestamp}</div>
+                    </div>
+                    <div class="message-text">{content}</div>
+                </div>
+            </div>
+"""
+
+FOOTER = """
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+
+class Transcript(NamedTuple):
+    """A rendered transcript ready to hand to disnake.File"""
+    file: tempfile.SpooledTemporaryFile
+    filename: str
+    size: int
+    render_ms: float
+    message_count: int
+    compressed: bool
+
+    def metrics(self):
+        return {
+            "size": self.size,
+            "render_ms": round(self.render_ms, 1),
+            "messages": self.message_count,
+            "compressed": self.compressed
+        }
+
+
+def _format_time(value):
+    return datetime.datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S") if value else ""
+
+
+def render_embed(embed):
+    """Render an embed dict ({title, description, fields}) as escaped HTML"""
+    content = f"<div class='embed'><div class='embed-title'>{html.escape(embed.get('title') or '')}</div>"
+    if embed.get("description"):
+        content += f"<div class='embed-description'>{html.escape(embed['description'])}</div>"
+    for field in embed.get("fields", []):
+        content += (
+            f"<div class='embed-field'><div class='field-name'>{html.escape(field['name'])}</div>"
+            f"<div class='field-value'>{html.escape(field['value'])}</div></div>"
+        )
+    return content + "</div>"
+
+
+def render_message(message):
+    """Render one message dict ({author, avatar, timestamp, content, embeds}) as HTML"""
+    content = html.escape(message.get("content") or "")
+    content += "".join(render_embed(embed) for embed in message.get("embeds", []))
+    return MESSAGE.format(
+        avatar=html.escape(message.get("avatar") or "", quote=True),
+        author=html.escape(message.get("author") or ""),
+        timestamp=html.escape(message.get("timestamp") or ""),
+        content=content
+    )
+
+
+async def render_transcript(ticket_data, messages, filename, compress=None):
+    """Stream an HTML transcript into a spooled buffer.
+
+    `messages` is an async iterable of message dicts; each one is rendered
+    and written as it arrives, so the full history is never held in memory.
+    With compress=None the result is gzipped only if it exceeds GZIP_THRESHOLD.
+    """
+    started = time.perf_counter()
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode="w+b")
+    buffer.write(HEADER.format(
+        ticket_id=html.escape(str(ticket_data["ticket_id"])),
+        category=html.escape(ticket_data.get("category", "")),
+        issue=html.escape(ticket_data.get("issue", "")),
+        created=_format_time(ticket_data.get("created_at")),
+        closed=_format_time(ticket_data.get("closed_at"))
+    ).encode("utf-8"))
+
+    message_count = 0
+    async for message in messages:
+        buffer.write(render_message(message).encode("utf-8"))
+        message_count += 1
+
+    buffer.write(FOOTER.encode("utf-8"))
+
+    if compress is None:
+        compress = buffer.tell() > GZIP_THRESHOLD
+    if compress:
+        buffer.seek(0)
+        compressed = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode="w+b")
+        with gzip.GzipFile(filename=filename, mode="wb", fileobj=compressed) as gz:
+            shutil.copyfileobj(buffer, gz)
+        buffer.close()
+        buffer = compressed
+        filename = f"{filename}.gz"
+
+    size = buffer.tell()
+    buffer.seek(0)
+    return Transcript(
+        file=buffer,
+        filename=filename,
+        size=size,
+        render_ms=(time.perf_counter() - started) * 1000,
+        message_count=message_count,
+        compressed=compress
+    )
@@ -0,0 +1,254 @@
+# services/user_store.py
+import json
+import os
+import sqlite3
+import threading
+
+
+class UserStore:
+    """Base class for user/ownership storage.
+
+    Every backend hands out user records in the same shape as users.json:
+    {"total-payment": int, "ownership": {product_name: license_key}}
+    """
+
+    def get_user(self, user_id):
+        """Return the record for a user, or None if the user is unknown"""
+        raise NotImplementedError
+
+    def grant(self, user_id, product_name, license_key, payment=0):
+        """Give a user ownership of a product and add to their total payment"""
+        raise NotImplementedError
+
+    def all_users(self):
+        """Return every user as a {user_id: record} dict"""
+        raise NotImplementedError
+
+    def owners_of(self, product_name):
+        """Return the ids of every user owning a product, sorted"""
+        return sorted(
+            user_id for user_id, user in self.all_users().items()
+            if product_name in user.get("ownership", {})
+        )
+
+    def count(self):
+        """Return the number of known users"""
+        return len(self.all_users())
+
+    def close(self):
+        pass
+
+
+class JsonUserStore(UserStore):
+    """Original backend: the whole users.json is read and rewritten per change"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # product -> set of owner ids, built on first use and kept up to date by grant()
+        self.owners = None
+        self.owners_mtime = None
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error loading {self.path}: {e}")
+            return {}
+
+    def _save(self, users):
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(users, file, indent=4)
+
+    def get_user(self, user_id):
+        return self._load().get(str(user_id))
+
+    def grant(self, user_id, product_name, license_key, payment=0):
+        user_id = str(user_id)
+        with self.lock:
+            users = self._load()
+            user = users.setdefault(user_id, {"total-payment": 0, "ownership": {}})
+            user["total-payment"] += payment
+            user["ownership"][product_name] = license_key
+            self._save(users)
+            if self.owners is not None:
+                self.owners.setdefault(product_name, set()).add(user_id)
+                self.owners_mtime = self._mtime()
+        return user
+
+    def all_users(self):
+        return self._load()
+
+    def owners_of(self, product_name):
+        with self.lock:
+            # Rebuild if users.json was changed by something other than grant()
+            if self.owners is None or self.owners_mtime != self._mtime():
+                self.owners = {}
+                for user_id, user in self._load().items():
+                    for product in user.get("ownership", {}):
+                        self.owners.setdefault(product, set()).add(user_id)
+                self.owners_mtime = self._mtime()
+            return sorted(self.owners.get(product_name, ()))
+
+
+class SQLiteUserStore(UserStore):
+    """SQLite backend in WAL mode; a sale only touches the buyer's rows"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            total_payment INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS ownership (
+            user_id TEXT NOT NULL,
+            product TEXT NOT NULL,
+            license_key TEXT NOT NULL,
+            PRIMARY KEY (user_id, product)
+        );
+        CREATE INDEX IF NOT EXISTS idx_ownership_user ON ownership (user_id);
+        CREATE INDEX IF NOT EXISTS idx_ownership_product ON ownership (product);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # One connection shared between the event loop and worker threads
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def get_user(self, user_id):
+        user_id = str(user_id)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT total_payment FROM users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            ownership = self.conn.execute(
+                "SELECT product, license_key FROM ownership WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        return {"total-payment": row[0], "ownership": dict(ownership)}
+
+    def grant(self, user_id, product_name, license_key, payment=0):
+        user_id = str(user_id)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # The increment happens inside SQLite, so two staff members
+                # confirming orders at once cannot overwrite each other
+                self.conn.execute(
+                    "INSERT INTO users (user_id, total_payment) VALUES (?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET total_payment = total_payment + excluded.total_payment",
+                    (user_id, payment)
+                )
+                self.conn.execute(
+                    "INSERT INTO ownership (user_id, product, license_key) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id, product) DO UPDATE SET license_key = excluded.license_key",
+                    (user_id, product_name, license_key)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self.get_user(user_id)
+
+    def all_users(self):
+        with self.lock:
+            users = {
+                user_id: {"total-payment": total, "ownership": {}}
+                for user_id, total in self.conn.execute("SELECT user_id, total_payment FROM users")
+            }
+            for user_id, product, license_key in self.conn.execute(
+                "SELECT user_id, product, license_key FROM ownership"
+            ):
+                users.setdefault(user_id, {"total-payment": 0, "ownership": {}})["ownership"][product] = license_key
+        return users
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def owners_of(self, product_name):
+        # Served by idx_ownership_product
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT user_id FROM ownership WHERE product = ? ORDER BY user_id", (product_name,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_meta(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def import_users(self, users, marker=None):
+        """Bulk load a users.json style dict in a single transaction"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO users (user_id, total_payment) VALUES (?, ?)",
+                    ((str(user_id), int(data.get("total-payment", 0))) for user_id, data in users.items())
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO ownership (user_id, product, license_key) VALUES (?, ?, ?)",
+                    (
+                        (str(user_id), product, license_key)
+                        for user_id, data in users.items()
+                        for product, license_key in data.get("ownership", {}).items()
+                    )
+                )
+                if marker:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", marker
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def migrate_json_to_sqlite(json_path, store):
+    """Copy users.json into the SQLite store once; returns the number of users imported"""
+    if store.get_meta("migrated_from_json") or not os.path.exists(json_path):
+        return 0
+
+    with open(json_path, "r", encoding="utf-8") as file:
+        users = json.load(file) or {}
+
+    store.import_users(users, marker=("migrated_from_json", json_path))
+    print(f"Migrated {len(users)} users from {json_path} to {store.path}")
+    return len(users)
+
+
+def open_user_store(backend, json_path, db_path):
+    """Create the configured user store ("json" or "sqlite")"""
+    if backend == "json":
+        return JsonUserStore(json_path)
+    if backend == "sqlite":
+        store = SQLiteUserStore(db_path)
+        migrate_json_to_sqlite(json_path, store)
+        return store
+    raise ValueError(f"Unknown user store backend: {backend}")
@@ -0,0 +1,61 @@
+# services/weighted_draw.py
+import heapq
+import math
+import random
+import secrets
+
+
+def new_seed():
+    """Random 64-bit seed for a draw; logged so the draw can be reproduced"""
+    return secrets.randbits(64)
+
+
+def tier_weights(guild, role_ids, weights):
+    """Map member id -> draw weight from the membership roles' member lists.
+
+    One pass over each tier role's members instead of a lookup per entrant.
+    A member holding several tiers gets the highest weight.
+    """
+    by_member = {}
+    for tier, weight in sorted(weights.items(), key=lambda item: item[1]):
+        role = guild.get_role(role_ids[tier]) if tier in role_ids else None
+        if role is None:
+            continue
+        for member in role.members:
+            by_member[member.id] = weight
+    return by_member
+
+
+def weighted_sample(population, k, weights, seed):
+    """Draw k distinct items, each with probability proportional to its weight.
+
+    Efraimidis-Spirakis A-Res: every item gets the key log(u) / w and the k
+    largest keys win, which is weighted sampling without replacement in a
+    single O(n log k) pass. Items missing from `weights` weigh 1. The same
+    population order, weights and seed always give the same winners.
+    """
+    rand = random.Random(seed).random
+    log = math.log
+    weight_of = weights.get
+    # 1 - random() is in (0, 1], so the log is always defined
+    keys = [log(1.0 - rand()) / weight_of(item, 1) for item in population]
+    top = heapq.nlargest(k, range(len(keys)), key=keys.__getitem__)
+    return [population[i] for i in top]
+
+
+def draw_winners(participants, k, member_weights, seed=None):
+    """Weighted draw over participants; returns (winners, draw record).
+
+    The record holds everything needed to reproduce the draw from the same
+    participant list: the seed and the weight of every non-default entrant.
+    """
+    if seed is None:
+        seed = new_seed()
+    weighted = {user_id: member_weights[user_id] for user_id in participants if user_id in member_weights}
+    winners = weighted_sample(participants, min(k, len(participants)), weighted, seed)
+    return winners, {
+        "seed": seed,
+        "entrants": len(participants),
+        # JSON object keys are strings
+        "weights": {str(user_id): weight for user_id, weight in weighted.items()}
+    }